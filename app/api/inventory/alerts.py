@@ -0,0 +1,195 @@
+import json
+import time
+import anyio
+from decouple import config
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, or_
+from sqlalchemy.orm import Session
+from api.inventory import models
+from db.session import ReadSessionLocal
+
+# ------------------------------ Stock Alerts ---------------------------------------------------------
+
+# Time between two reads of new alerts by a stream, in seconds
+STOCK_ALERT_POLL_INTERVAL = config("STOCK_ALERT_POLL_INTERVAL", default=1.0, cast=float)
+# A comment is sent on idle streams at this interval, in seconds, so proxies keep them open
+STOCK_ALERT_HEARTBEAT_INTERVAL = config("STOCK_ALERT_HEARTBEAT_INTERVAL", default=15.0, cast=float)
+# IDs skipped by a stream are read again for this long, in seconds: the transaction that
+# took them may commit after alerts with higher IDs
+STOCK_ALERT_GAP_TIMEOUT = config("STOCK_ALERT_GAP_TIMEOUT", default=30.0, cast=float)
+# Maximum number of alerts read per poll
+STOCK_ALERT_BATCH_SIZE = 100
+# Maximum number of ranges of skipped IDs watched by a stream (the oldest are dropped)
+STOCK_ALERT_MAX_GAPS = 100
+# Delay before a client reconnects to a dropped stream, in milliseconds
+STOCK_ALERT_RETRY_MS = 3000
+
+# Name of the server-sent events carrying alerts
+STOCK_ALERT_EVENT = "threshold_crossed"
+
+
+# Function to place a quantity in a stock range
+def get_stock_level(quantity: int, reorder_threshold: int):
+    """
+    Get the stock range a quantity falls into.
+
+    Args:
+        quantity (int): Total quantity of an inventory item.
+        reorder_threshold (int): Reorder threshold of the item.
+
+    Returns:
+        int: 0 when out of stock, 1 when low (at or below the threshold), 2 otherwise.
+    """
+    if quantity <= 0:
+        return 0
+    return 1 if quantity <= reorder_threshold else 2
+
+# Function to record the threshold crossings of stock changes
+def record_stock_alerts(db: Session, changes):
+    """
+    Record an alert for each stock change that crosses a threshold, in the caller's transaction.
+
+    Args:
+        db (Session): Database session.
+        changes (List[Dict]): inventory_id, previous_quantity, quantity, reorder_threshold
+            and status (after the change) of each changed item.
+
+    Returns:
+        int: Number of alerts recorded.
+    """
+    alerts = [
+        change for change in changes
+        if get_stock_level(change["previous_quantity"], change["reorder_threshold"])
+        != get_stock_level(change["quantity"], change["reorder_threshold"])
+    ]
+    if alerts:
+        db.execute(insert(models.InventoryAlert), alerts)
+    return len(alerts)
+
+# Function to get the ID of the latest alert
+def get_latest_stock_alert_id(db: Session):
+    """
+    Get the ID of the latest alert.
+
+    Args:
+        db (Session): Database session.
+
+    Returns:
+        int: ID of the latest alert, 0 if there is none.
+    """
+    return db.query(func.max(models.InventoryAlert.id)).scalar() or 0
+
+# Function to get the alerts recorded after a given one
+def get_stock_alerts(db: Session, after_id: int, limit: int = STOCK_ALERT_BATCH_SIZE, gaps=()):
+    """
+    Get the alerts recorded after a given alert, oldest first.
+
+    Args:
+        db (Session): Database session.
+        after_id (int): ID of the last alert already seen.
+        limit (int): Maximum number of alerts to return.
+        gaps (Iterable[Tuple[int, int]]): Ranges of IDs below `after_id` that were not
+            seen yet, bounds included (optional).
+
+    Returns:
+        List[InventoryAlert]: Alerts following `after_id` or within `gaps`.
+    """
+    ranges = [models.InventoryAlert.id.between(low, high) for low, high in gaps]
+    return (
+        db.query(models.InventoryAlert)
+        .filter(or_(models.InventoryAlert.id > after_id, *ranges))
+        .order_by(models.InventoryAlert.id)
+        .limit(limit)
+        .all()
+    )
+
+# Function to remove a received ID from the ranges of skipped IDs
+def _fill_gap(gaps, alert_id):
+    for index, (low, high, expires) in enumerate(gaps):
+        if low <= alert_id <= high:
+            remaining = [(low, alert_id - 1, expires), (alert_id + 1, high, expires)]
+            gaps[index:index + 1] = [gap for gap in remaining if gap[0] <= gap[1]]
+            return
+
+# Function to encode an alert as a server-sent event
+def format_stock_alert(alert: models.InventoryAlert):
+    """
+    Encode an alert as a server-sent event, identified by the alert ID.
+
+    Args:
+        alert (InventoryAlert): Alert to encode.
+
+    Returns:
+        str: Event text.
+    """
+    data = {
+        "id": alert.id,
+        "inventory_id": alert.inventory_id,
+        "previous_quantity": alert.previous_quantity,
+        "quantity": alert.quantity,
+        "reorder_threshold": alert.reorder_threshold,
+        "status": alert.status.value,
+        "created_at": alert.created_at.isoformat() if alert.created_at else None,
+    }
+    return f"id: {alert.id}\nevent: {STOCK_ALERT_EVENT}\ndata: {json.dumps(data)}\n\n"
+
+# Function to run a read with a short-lived session
+def _read(function, *args):
+    db = ReadSessionLocal()
+    try:
+        return function(db, *args)
+    finally:
+        db.close()
+
+# Function to stream the alerts as server-sent events
+async def stream_stock_alerts(request: Request, after_id: int = None):
+    """
+    Stream the alerts recorded after a given alert as server-sent events.
+
+    New alerts are read every STOCK_ALERT_POLL_INTERVAL seconds, so the stream sees the
+    stock changes of every worker. A connection is only held during each read.
+
+    Alert IDs are taken when the alert is inserted, so concurrent transactions may commit
+    them out of order. IDs skipped by the stream are read again with each poll for
+    STOCK_ALERT_GAP_TIMEOUT seconds, and each alert is sent once.
+
+    Args:
+        request (Request): Streaming request, checked for disconnection.
+        after_id (int): ID of the last alert already seen (optional, only alerts recorded
+            after the stream opens are sent by default).
+
+    Yields:
+        str: Event text.
+    """
+    if after_id is None:
+        after_id = await run_in_threadpool(_read, get_latest_stock_alert_id)
+    yield f"retry: {STOCK_ALERT_RETRY_MS}\n\n"
+
+    # Ranges of skipped IDs, as (low, high, expiry time) tuples
+    gaps = []
+    idle = 0.0
+    while not await request.is_disconnected():
+        now = time.monotonic()
+        gaps = [gap for gap in gaps if gap[2] > now][-STOCK_ALERT_MAX_GAPS:]
+        alerts = await run_in_threadpool(
+            _read, get_stock_alerts, after_id, STOCK_ALERT_BATCH_SIZE, [gap[:2] for gap in gaps]
+        )
+        for alert in alerts:
+            if alert.id > after_id:
+                if alert.id > after_id + 1:
+                    gaps.append((after_id + 1, alert.id - 1, now + STOCK_ALERT_GAP_TIMEOUT))
+                after_id = alert.id
+            else:
+                _fill_gap(gaps, alert.id)
+            yield format_stock_alert(alert)
+        if len(alerts) == STOCK_ALERT_BATCH_SIZE:
+            # More alerts are waiting
+            continue
+        if alerts:
+            idle = 0.0
+        elif idle >= STOCK_ALERT_HEARTBEAT_INTERVAL:
+            yield ": keep-alive\n\n"
+            idle = 0.0
+        await anyio.sleep(STOCK_ALERT_POLL_INTERVAL)
+        idle += STOCK_ALERT_POLL_INTERVAL
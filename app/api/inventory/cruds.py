@@ -1,13 +1,33 @@
 import math
-from sqlalchemy import func, select
+import random
+from datetime import timedelta
+from sqlalchemy import case, func, insert, literal, select, update
 from sqlalchemy.orm import Session
 from api.inventory import models
-from api.inventory.schemas import GetInventoryHistory, PaginatedInventory
+from api.inventory.alerts import record_stock_alerts
+from api.inventory.history_writer import record_inventory_history
+from api.product.models import Product
+from api.inventory.schemas import GetInventoryHistory, PaginatedInventory, InventoryAsOf, InventoryState
+from utils.enums import Category, InventoryStatus
+from utils.listing import make_etag
+
+# Columns that can be selected with the `fields` parameter of the inventory listing
+INVENTORY_FIELDS = ("id", "product_id", "quantity", "last_updated", "status", "shard_count", "reorder_threshold")
+
+# Statuses listed by the low stock listing
+LOW_STOCK_STATUSES = (InventoryStatus.LOW, InventoryStatus.OUT_OF_STOCK)
+
+# History recorded shortly before a checkpoint is replayed on top of it, to cover
+# transactions that committed after the checkpoint was read
+SNAPSHOT_OVERLAP = timedelta(minutes=1)
 
 # Function to create a new inventory item
 def create_inventory(db: Session, inventory_data):
     """
-    Create a new inventory item.
+    Create a new inventory item and its first history entry.
+
+    The status is derived from the initial quantity when it is at or below the reorder
+    threshold. The item is flushed to get its ID but not committed; the caller commits.
 
     Args:
         db (Session): Database session.
@@ -17,30 +37,194 @@ def create_inventory(db: Session, inventory_data):
         Inventory: Created inventory item.
     """
     db_inventory = models.Inventory(**inventory_data)
+    if db_inventory.reorder_threshold is None:
+        db_inventory.reorder_threshold = models.DEFAULT_REORDER_THRESHOLD
+    db_inventory.status = get_stock_status(db_inventory.quantity, db_inventory.status, db_inventory.reorder_threshold)
     db.add(db_inventory)
-    db.commit()
-    db.refresh(db_inventory)
+    db.flush()
     create_inventory_history(db, db_inventory)
     return db_inventory
 
-# Function to retrieve all inventory items
-def get_all_inventory(db: Session):
+# Function to build the expression of the total stock of an inventory item
+def get_total_quantity_column():
+    """
+    Build the expression of the total stock of an inventory item.
+
+    The total is the quantity kept on the inventory row plus the quantity of its stock
+    counter shards, which covers both the single-row and the sharded mode.
+
+    Returns:
+        ColumnElement: Total quantity expression, correlated to the inventory table.
+    """
+    shard_quantity = (
+        select(func.sum(models.InventoryShard.quantity))
+        .where(models.InventoryShard.inventory_id == models.Inventory.id)
+        .scalar_subquery()
+    )
+    return models.Inventory.quantity + func.coalesce(shard_quantity, 0)
+
+# Function to build the filters of the inventory listing
+def get_inventory_filters(status: InventoryStatus = None, category: Category = None):
+    """
+    Build the filters of the inventory listing.
+
+    Args:
+        status (InventoryStatus): Only list items with this status (optional).
+        category (Category): Only list items of products in this category (optional).
+
+    Returns:
+        List[ColumnElement]: Filter expressions on the inventory table.
+    """
+    filters = []
+    if status is not None:
+        filters.append(models.Inventory.status == status)
+    if category is not None:
+        filters.append(models.Inventory.product_id.in_(select(Product.id).where(Product.category == category)))
+    return filters
+
+# Function to compute the entity tag of the inventory listing
+def get_inventory_etag(db: Session, status: InventoryStatus = None, category: Category = None):
+    """
+    Compute an entity tag that changes whenever the listed inventory items change.
+
+    The tag is derived from aggregates of the matching items (count, latest update and
+    total stock, including the stock counter shards, which sales update without touching
+    the inventory row), so it costs two aggregate queries and no row is loaded.
+
+    Args:
+        db (Session): Database session.
+        status (InventoryStatus): Only consider items with this status (optional).
+        category (Category): Only consider items of products in this category (optional).
+
+    Returns:
+        str: Weak entity tag of the listing.
+    """
+    filters = get_inventory_filters(status, category)
+    count, last_updated, quantity = (
+        db.query(func.count(models.Inventory.id), func.max(models.Inventory.last_updated),
+                 func.sum(models.Inventory.quantity))
+        .filter(*filters)
+        .one()
+    )
+    shard_quantity = (
+        db.query(func.sum(models.InventoryShard.quantity))
+        .join(models.Inventory, models.Inventory.id == models.InventoryShard.inventory_id)
+        .filter(*filters)
+        .scalar()
+    )
+    return make_etag(count, last_updated, quantity, shard_quantity)
+
+# Function to retrieve a page of inventory items
+def get_all_inventory(db: Session, fields=None, status: InventoryStatus = None, category: Category = None,
+                      cursor: int = None, limit: int = 100):
+    """
+    Retrieve a page of inventory items, ordered by ID.
+
+    Only the requested columns are selected. Pages are read by keyset on the ID, so every
+    page costs O(limit).
+
+    Args:
+        db (Session): Database session.
+        fields (List[str]): Columns to return, from INVENTORY_FIELDS (optional, every column by default).
+        status (InventoryStatus): Only list items with this status (optional).
+        category (Category): Only list items of products in this category (optional).
+        cursor (int): ID of the last item of the previous page (optional).
+        limit (int): Maximum number of items per page.
+
+    Returns:
+        Dict: Items on the page, with the total quantity of sharded items, and the next cursor.
+    """
+    columns = {
+        "id": models.Inventory.id,
+        "product_id": models.Inventory.product_id,
+        "quantity": get_total_quantity_column().label("quantity"),
+        "last_updated": models.Inventory.last_updated,
+        "status": models.Inventory.status,
+        "shard_count": models.Inventory.shard_count,
+        "reorder_threshold": models.Inventory.reorder_threshold,
+    }
+    fields = fields or list(INVENTORY_FIELDS)
+    query = db.query(models.Inventory.id.label("cursor_id"), *(columns[name] for name in fields))
+    query = query.filter(*get_inventory_filters(status, category))
+    if cursor is not None:
+        query = query.filter(models.Inventory.id > cursor)
+    rows = query.order_by(models.Inventory.id).limit(limit + 1).all()
+
+    items = [{name: getattr(row, name) for name in fields} for row in rows[:limit]]
+    next_cursor = rows[limit - 1].cursor_id if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+# Function to build the query of inventory items with their total quantity
+def query_inventory_totals(db: Session):
+    """
+    Build a query of inventory items reporting the total quantity as `quantity`.
+
+    Args:
+        db (Session): Database session.
+
+    Returns:
+        Query: Query of inventory item rows.
+    """
+    return db.query(
+        models.Inventory.id,
+        models.Inventory.product_id,
+        get_total_quantity_column().label("quantity"),
+        models.Inventory.last_updated,
+        models.Inventory.status,
+        models.Inventory.shard_count,
+        models.Inventory.reorder_threshold,
+    )
+
+# Function to retrieve a page of the items low on or out of stock
+def get_low_stock_inventory(db: Session, status: InventoryStatus = None, cursor: int = None, limit: int = 100):
     """
-    Retrieve all inventory items.
+    Retrieve a page of the inventory items low on or out of stock, ordered by ID.
+
+    Statuses are maintained by every stock change, so the items are found through the
+    index on (status, id) and a page costs O(limit) whatever the size of the catalog.
 
     Args:
         db (Session): Database session.
+        status (InventoryStatus): Only list items with this status, LOW or OUT_OF_STOCK
+            (optional, both by default).
+        cursor (int): ID of the last item of the previous page (optional).
+        limit (int): Maximum number of items per page.
 
     Returns:
-        List[Inventory]: List of inventory items.
+        Dict: Items on the page, with their total quantity, and the next cursor.
     """
-    return db.query(models.Inventory).all()
+    statuses = [status] if status is not None else list(LOW_STOCK_STATUSES)
+    query = query_inventory_totals(db).filter(models.Inventory.status.in_(statuses))
+    if cursor is not None:
+        query = query.filter(models.Inventory.id > cursor)
+    rows = query.order_by(models.Inventory.id).limit(limit + 1).all()
+
+    items = [row._asdict() for row in rows[:limit]]
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+# Function to retrieve an inventory item with its total quantity
+def get_inventory_totals_by_id(db: Session, inventory_id: int):
+    """
+    Retrieve an inventory item reporting the total quantity of sharded items.
+
+    Args:
+        db (Session): Database session.
+        inventory_id (int): ID of the inventory item.
+
+    Returns:
+        Dict: Inventory item, or None if it does not exist.
+    """
+    row = query_inventory_totals(db).filter(models.Inventory.id == inventory_id).first()
+    return row._asdict() if row else None
 
 # Function to retrieve an inventory item by its ID
 def get_inventory_by_id(db: Session, inventory_id: int):
     """
     Retrieve an inventory item by its ID.
 
+    Items already loaded in the session are returned without querying the database.
+
     Args:
         db (Session): Database session.
         inventory_id (int): ID of the inventory item.
@@ -48,32 +232,49 @@ def get_inventory_by_id(db: Session, inventory_id: int):
     Returns:
         Inventory: Retrieved inventory item.
     """
-    return db.query(models.Inventory).filter(models.Inventory.id == inventory_id).first()
+    return db.get(models.Inventory, inventory_id)
 
 # Function to retrieve an inventory item history by its ID
-def get_inventory_history(db: Session, inventory_id, page, per_page):
+def get_inventory_history(db: Session, inventory_id, page, per_page, before_id=None):
     """
-    Retrieve the history of an inventory item.
+    Retrieve the history of an inventory item, newest first.
+
+    Pages are read from the `(inventory_id, id)` index. With `before_id` the page starts
+    after that entry (keyset pagination), so every page costs O(per_page) and the total
+    is not counted; otherwise `page` selects the page by offset and the total is counted.
 
     Args:
         db (Session): Database session.
         inventory_id (int): ID of the inventory item.
         page (int): Page number.
         per_page (int): Items per page.
+        before_id (int): ID of the last history entry of the previous page (optional).
 
     Returns:
         PaginatedInventory: Paginated result of inventory item history.
     """
-    limit = per_page * page
-    offset = (page - 1) * per_page
-    items = [GetInventoryHistory(id=item.id, inventory_id=item.inventory_id, quantity=item.quantity,
-                                 last_updated=item.last_updated, status=item.status)
-             for item in db.scalars(select(models.InventoryHistory).where(models.InventoryHistory.inventory_id == inventory_id)
-                                   .limit(limit).offset(offset).order_by(models.InventoryHistory.id.desc()))]
-    items_list = db.query(models.InventoryHistory).filter(models.InventoryHistory.inventory_id == inventory_id).all()
-    total = math.ceil(len(items_list) / limit)
+    history = models.InventoryHistory
+    query = (
+        select(history.id, history.inventory_id, history.quantity, history.last_updated, history.status)
+        .where(history.inventory_id == inventory_id)
+        .order_by(history.id.desc())
+        .limit(per_page)
+    )
+    if before_id is not None:
+        query = query.where(history.id < before_id)
+    else:
+        query = query.offset((page - 1) * per_page)
+    items = [GetInventoryHistory(**row._asdict()) for row in db.execute(query)]
+    next_before_id = items[-1].id if len(items) == per_page else None
+
+    if before_id is not None:
+        return PaginatedInventory(page_number=page, items=items, next_before_id=next_before_id)
 
-    return PaginatedInventory(page_number=page, total_pages=total, items=items)
+    total_items = db.scalar(select(func.count()).select_from(history).where(history.inventory_id == inventory_id))
+    total = math.ceil(total_items / per_page)
+
+    return PaginatedInventory(page_number=page, total_pages=total, total_items=total_items, items=items,
+                              next_before_id=next_before_id)
 
 # Function to retrieve an inventory item by the ID of its associated product
 def get_inventory_by_product_id(db: Session, product_id: int):
@@ -92,25 +293,43 @@ def get_inventory_by_product_id(db: Session, product_id: int):
 # Function to update an inventory item
 def update_inventory(db: Session, inventory_id, update_data):
     """
-    Update an inventory item.
+    Update an inventory item and record the new state in its history.
+
+    The requested status is replaced by the one derived from the new quantity when the
+    item is at or below its reorder threshold, or back above it after being low. A
+    threshold crossing is recorded as an alert. The changes are flushed but not
+    committed; the caller commits.
 
     Args:
         db (Session): Database session.
         inventory_id (int): ID of the inventory item to be updated.
-        update_data (dict): Data for updating the inventory item.
+        update_data (UpdateInventory): Data for updating the inventory item.
 
     Returns:
         Inventory: Updated inventory item.
     """
     existing_inventory = get_inventory_by_id(db, inventory_id)
-    # Update the fields
-    existing_inventory.quantity = update_data.quantity
-    existing_inventory.status = update_data.status
+    previous_quantity = get_inventory_quantity(existing_inventory)
+    if update_data.reorder_threshold is not None:
+        existing_inventory.reorder_threshold = update_data.reorder_threshold
+    # Update the fields, spreading the new quantity over the shards of sharded items
+    if existing_inventory.shard_count:
+        distribute_stock(db, existing_inventory, update_data.quantity, existing_inventory.shard_count)
+    else:
+        existing_inventory.quantity = update_data.quantity
+    existing_inventory.status = get_stock_status(update_data.quantity, update_data.status,
+                                                 existing_inventory.reorder_threshold)
     create_inventory_history(db, existing_inventory)
+    record_stock_alerts(db, [{
+        "inventory_id": existing_inventory.id,
+        "previous_quantity": previous_quantity,
+        "quantity": update_data.quantity,
+        "reorder_threshold": existing_inventory.reorder_threshold,
+        "status": existing_inventory.status,
+    }])
 
-    # Save the changes
-    db.commit()
-    db.refresh(existing_inventory)
+    # Send the changes without committing them
+    db.flush()
     return existing_inventory
 
 # Function to create inventory history
@@ -118,20 +337,339 @@ def create_inventory_history(db: Session, inventory):
     """
     Create a new version in the history table for the inventory item.
 
+    The entry is written with the caller's commit, or by the background history writer
+    once the caller commits when HISTORY_WRITE_MODE is "batched".
+
     Args:
         db (Session): Database session.
         inventory (Inventory): Inventory item for which history is created.
-
-    Returns:
-        InventoryHistory: Created inventory history entry.
     """
     history_data = {
         "inventory_id": inventory.id,
-        "quantity": inventory.quantity,
+        "quantity": get_inventory_quantity(inventory),
         "status": inventory.status,
     }
-    db_history = models.InventoryHistory(**history_data)
-    db.add(db_history)
+    record_inventory_history(db, [history_data])
+
+# Function to compute the total stock of a loaded inventory item
+def get_inventory_quantity(inventory):
+    """
+    Get the total stock of a loaded inventory item, including its stock counter shards.
+
+    Args:
+        inventory (Inventory): Inventory item.
+
+    Returns:
+        int: Total quantity.
+    """
+    if inventory.shard_count:
+        return inventory.quantity + sum(shard.quantity for shard in inventory.shards)
+    return inventory.quantity
+
+# Function to compute the status of an inventory item after its quantity changed
+def get_stock_status(quantity: int, status: InventoryStatus, reorder_threshold: int):
+    """
+    Compute the status of an inventory item from its new quantity.
+
+    Args:
+        quantity (int): New quantity of the inventory item.
+        status (InventoryStatus): Current status of the inventory item.
+        reorder_threshold (int): Quantity at or below which the item is low on stock.
+
+    Returns:
+        InventoryStatus: OUT_OF_STOCK when empty, LOW at or below the reorder threshold,
+        AVAILABLE above it for an item that was low or out of stock, otherwise the
+        current status.
+    """
+    if quantity <= 0:
+        return InventoryStatus.OUT_OF_STOCK
+    if quantity <= reorder_threshold:
+        return InventoryStatus.LOW
+    if status in LOW_STOCK_STATUSES:
+        return InventoryStatus.AVAILABLE
+    return status
+
+# Function to build the SQL counterpart of get_stock_status
+def get_stock_status_column(quantity):
+    """
+    Build the expression of the status of an inventory item for a new quantity, as
+    computed by `get_stock_status`.
+
+    Args:
+        quantity (ColumnElement): New total quantity of the inventory item.
+
+    Returns:
+        ColumnElement: Status expression, correlated to the inventory table.
+    """
+    status_type = models.Inventory.status.type
+    return case(
+        (quantity <= 0, literal(InventoryStatus.OUT_OF_STOCK, status_type)),
+        (quantity <= models.Inventory.reorder_threshold, literal(InventoryStatus.LOW, status_type)),
+        (models.Inventory.status.in_(LOW_STOCK_STATUSES), literal(InventoryStatus.AVAILABLE, status_type)),
+        else_=models.Inventory.status
+    )
+
+# Function to bring the status of every inventory item in line with its stock
+def refresh_stock_statuses(db: Session):
+    """
+    Recompute the status of every inventory item from its total quantity and reorder
+    threshold, e.g. after upgrading from a version that did not maintain it.
+
+    Args:
+        db (Session): Database session.
+
+    Returns:
+        int: Number of updated items.
+    """
+    result = db.execute(
+        update(models.Inventory)
+        .values(status=get_stock_status_column(get_total_quantity_column()))
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
-    db.refresh(db_history)
-    return db_history
+    return result.rowcount
+
+# Function to atomically decrement the stock of an inventory item
+def decrement_stock(db: Session, inventory_id: int, quantity: int):
+    """
+    Decrement the stock of an inventory item if enough of it remains.
+
+    The check, the decrement and the status transition happen in one conditional UPDATE,
+    so concurrent sales can neither oversell nor lose updates. Nothing is committed.
+
+    Args:
+        db (Session): Database session.
+        inventory_id (int): ID of the inventory item.
+        quantity (int): Quantity to remove from the stock.
+
+    Returns:
+        bool: True if the stock was decremented, False if the item does not exist or
+        has less than `quantity` in stock.
+    """
+    new_quantity = models.Inventory.quantity - quantity
+    new_status = get_stock_status_column(new_quantity)
+    result = db.execute(
+        update(models.Inventory)
+        .where(models.Inventory.id == inventory_id, models.Inventory.quantity >= quantity)
+        # The status is assigned first: MySQL evaluates SET clauses left to right
+        .ordered_values((models.Inventory.status, new_status), (models.Inventory.quantity, new_quantity))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+# Function to decrement the stock of a sharded inventory item
+def decrement_sharded_stock(db: Session, inventory_id: int, shard_count: int, quantity: int,
+                            reorder_threshold: int, exact: bool = False):
+    """
+    Decrement the stock of a sharded inventory item if enough of it remains.
+
+    A random slot is tried first and the other slots follow in order, each with a
+    conditional update that only takes the sale if the slot keeps more than its share of
+    the reorder threshold, so concurrent sales usually lock different rows. The other
+    slots are not read, so no total is known after such a sale.
+
+    Otherwise, or when `exact` is set, the inventory row and then every slot are locked
+    (in the order used by restocks and resharding), the sale spills over several slots if
+    needed, and the totals before and after it are computed under those locks. The
+    inventory status is updated from them when it changes. Nothing is committed.
+
+    Args:
+        db (Session): Database session.
+        inventory_id (int): ID of the inventory item.
+        shard_count (int): Number of shards of the inventory item.
+        quantity (int): Quantity to remove from the stock.
+        reorder_threshold (int): Reorder threshold of the inventory item.
+        exact (bool): Always lock every slot and return the change.
+
+    Returns:
+        Tuple[bool, Dict]: Whether the stock was decremented, and the change (inventory_id,
+        previous_quantity, quantity, reorder_threshold and status after the sale) when every
+        slot was locked, None after a single-slot decrement.
+    """
+    shard = models.InventoryShard
+    if not exact:
+        first_slot = random.randrange(shard_count)
+        for offset in range(shard_count):
+            slot = (first_slot + offset) % shard_count
+            result = db.execute(
+                update(shard)
+                .where(shard.inventory_id == inventory_id, shard.slot == slot,
+                       shard.quantity - quantity > reorder_threshold // shard_count)
+                .values(quantity=shard.quantity - quantity)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                return True, None
+
+    # Lock every slot so the totals are exact
+    status, reorder_threshold = (
+        db.query(models.Inventory.status, models.Inventory.reorder_threshold)
+        .filter(models.Inventory.id == inventory_id)
+        .with_for_update().one()
+    )
+    shards = (
+        db.query(shard).filter(shard.inventory_id == inventory_id)
+        .order_by(shard.slot).with_for_update().all()
+    )
+    previous_total = sum(item.quantity for item in shards)
+    if previous_total < quantity:
+        return False, None
+    remaining = quantity
+    for item in shards:
+        taken = min(item.quantity, remaining)
+        item.quantity -= taken
+        remaining -= taken
+    db.flush()
+
+    total = previous_total - quantity
+    new_status = get_stock_status(total, status, reorder_threshold)
+    if new_status != status:
+        db.execute(
+            update(models.Inventory)
+            .where(models.Inventory.id == inventory_id)
+            .values(status=new_status)
+            .execution_options(synchronize_session=False)
+        )
+    return True, {
+        "inventory_id": inventory_id,
+        "previous_quantity": previous_total,
+        "quantity": total,
+        "reorder_threshold": reorder_threshold,
+        "status": new_status,
+    }
+
+# Function to spread a quantity over the shards of an inventory item
+def distribute_stock(db: Session, inventory, total: int, shard_count: int):
+    """
+    Replace the stock of an inventory item with `total` spread over `shard_count` shards.
+
+    With fewer than two shards the stock is collapsed back into the inventory row.
+    Nothing is committed.
+
+    Args:
+        db (Session): Database session.
+        inventory (Inventory): Inventory item, locked by the caller.
+        total (int): Total quantity to store.
+        shard_count (int): Number of shards to spread the quantity over.
+    """
+    inventory.shards.clear()
+    db.flush()
+
+    if shard_count < 2:
+        inventory.quantity = total
+        inventory.shard_count = 0
+        return
+
+    inventory.quantity = 0
+    inventory.shard_count = shard_count
+    share, extra = divmod(total, shard_count)
+    inventory.shards.extend(
+        models.InventoryShard(slot=slot, quantity=share + (1 if slot < extra else 0))
+        for slot in range(shard_count)
+    )
+
+# Function to rebalance, create or collapse the shards of an inventory item
+def reshard_inventory(db: Session, inventory_id: int, shard_count: int):
+    """
+    Rebalance the stock of an inventory item over a new number of shards.
+
+    The current total stock is spread evenly over `shard_count` shards, or moved back
+    into the inventory row when `shard_count` is 0 or 1.
+
+    Args:
+        db (Session): Database session.
+        inventory_id (int): ID of the inventory item.
+        shard_count (int): New number of shards.
+
+    Returns:
+        Dict: Inventory item with its total quantity, or None if it does not exist.
+    """
+    inventory = (
+        db.query(models.Inventory).filter(models.Inventory.id == inventory_id)
+        .with_for_update().first()
+    )
+    if inventory is None:
+        return None
+
+    shards = (
+        db.query(models.InventoryShard).filter(models.InventoryShard.inventory_id == inventory_id)
+        .with_for_update().all()
+    )
+    total = inventory.quantity + sum(shard.quantity for shard in shards)
+    distribute_stock(db, inventory, total, shard_count)
+    db.commit()
+    return get_inventory_totals_by_id(db, inventory_id)
+
+# Function to take a checkpoint of the state of every inventory item
+def create_inventory_snapshot(db: Session):
+    """
+    Take a checkpoint of the quantity and status of every inventory item.
+
+    The states are copied with a single INSERT ... SELECT. Run it periodically
+    (e.g. daily with `snapshot_inventory.py`) to bound the history read by
+    `get_inventory_as_of`.
+
+    Args:
+        db (Session): Database session.
+
+    Returns:
+        Dict: ID, timestamp and item count of the checkpoint.
+    """
+    snapshot = models.InventorySnapshot(taken_at=db.scalar(select(func.now())))
+    db.add(snapshot)
+    db.flush()
+
+    item_count = db.execute(
+        insert(models.InventorySnapshotItem).from_select(
+            ["snapshot_id", "inventory_id", "quantity", "status"],
+            select(literal(snapshot.id), models.Inventory.id, get_total_quantity_column(), models.Inventory.status)
+        )
+    ).rowcount
+    db.commit()
+    return {"id": snapshot.id, "taken_at": snapshot.taken_at, "item_count": item_count}
+
+# Function to rebuild the state of every inventory item at a point in time
+def get_inventory_as_of(db: Session, as_of):
+    """
+    Get the quantity and status of every inventory item at a point in time.
+
+    The states start from the latest checkpoint taken at or before `as_of`. The latest
+    history entry of each item recorded between the checkpoint and `as_of` is then
+    applied on top. History entries hold absolute states, so only the last one per
+    item matters and at most one checkpoint plus the entries since it are read.
+
+    Args:
+        db (Session): Database session.
+        as_of (datetime): Point in time.
+
+    Returns:
+        InventoryAsOf: State of each inventory item that existed at that time.
+    """
+    snapshot = (
+        db.query(models.InventorySnapshot)
+        .filter(models.InventorySnapshot.taken_at <= as_of)
+        .order_by(models.InventorySnapshot.taken_at.desc())
+        .first()
+    )
+
+    states = {}
+    if snapshot is not None:
+        items = db.query(
+            models.InventorySnapshotItem.inventory_id,
+            models.InventorySnapshotItem.quantity,
+            models.InventorySnapshotItem.status,
+        ).filter(models.InventorySnapshotItem.snapshot_id == snapshot.id)
+        states = {item.inventory_id: item._asdict() for item in items}
+
+    history = models.InventoryHistory
+    latest_entries = select(func.max(history.id)).where(history.last_updated <= as_of).group_by(history.inventory_id)
+    if snapshot is not None:
+        latest_entries = latest_entries.where(history.last_updated >= snapshot.taken_at - SNAPSHOT_OVERLAP)
+    changes = db.query(history.inventory_id, history.quantity, history.status).filter(history.id.in_(latest_entries))
+    states.update((change.inventory_id, change._asdict()) for change in changes)
+
+    return InventoryAsOf(
+        as_of=as_of,
+        checkpoint_taken_at=snapshot.taken_at if snapshot is not None else None,
+        items=[InventoryState(**state) for _, state in sorted(states.items())],
+    )
@@ -1,52 +1,171 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.session import get_async_db, get_async_read_db
 from api.inventory import cruds as inventory_cruds
-from api.inventory.schemas import GetInventory, UpdateInventory, PaginatedInventory
+from api.inventory.alerts import stream_stock_alerts
+from api.inventory.schemas import GetInventory, InventoryPage, LowStockPage, UpdateInventory, PaginatedInventory, ReshardInventory, InventoryAsOf, GetInventorySnapshot
+from utils.compression import no_compression
+from utils.enums import Category, InventoryStatus
+from utils.listing import etag_matches, parse_fields
+from utils.responses import trusted_response
 
 router = APIRouter()
 
 # ------------------------ Inventory Routes -----------------------------------------------------------
 
-@router.get("/inventory")
-async def get_all_inventory(db: Session = Depends(get_db)):
+@router.get("/inventory", response_model=InventoryPage, response_model_exclude_unset=True)
+async def get_all_inventory(
+    request: Request,
+    response: Response,
+    fields: str = Query(None, description="Comma-separated fields to return (e.g. id,quantity,status)"),
+    status: InventoryStatus = Query(None, description="Filter by status"),
+    category: Category = Query(None, description="Filter by product category"),
+    cursor: int = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of items per page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """
-    Get all inventory items.
+    Get a page of inventory items.
+
+    The response carries an ETag; when the If-None-Match header matches it, the items
+    are not read and 304 Not Modified is returned.
 
     Args:
-        db (Session): Database session.
+        fields (str): Comma-separated fields to return (optional, every field by default).
+        status (InventoryStatus): Optional filter by status.
+        category (Category): Optional filter by product category.
+        cursor (int): Cursor of the page to fetch (optional, first page if omitted).
+        limit (int): Maximum number of items per page.
+        db (AsyncSession): Database session.
 
     Returns:
-        List[GetInventory]: List of inventory items.
+        InventoryPage: Inventory items on the page and the cursor of the next page.
     """
-    return inventory_cruds.get_all_inventory(db)
+    fields = parse_fields(fields, inventory_cruds.INVENTORY_FIELDS)
+    etag = await db.run_sync(inventory_cruds.get_inventory_etag, status, category)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    page = await db.run_sync(inventory_cruds.get_all_inventory, fields, status, category, cursor, limit)
+    return trusted_response(page, response)
+
+@router.get("/inventory/low", response_model=LowStockPage)
+async def get_low_stock_inventory(
+    status: InventoryStatus = Query(None, description="Only list items with this status (Low or Out of Stock)"),
+    cursor: int = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of items per page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Get a page of the inventory items at or below their reorder threshold.
+
+    Args:
+        status (InventoryStatus): Optional filter, LOW or OUT_OF_STOCK (both by default).
+        cursor (int): Cursor of the page to fetch (optional, first page if omitted).
+        limit (int): Maximum number of items per page.
+        db (AsyncSession): Database session.
+
+    Returns:
+        LowStockPage: Inventory items on the page and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the status is neither LOW nor OUT_OF_STOCK.
+    """
+    if status is not None and status not in inventory_cruds.LOW_STOCK_STATUSES:
+        raise HTTPException(400, detail="Status must be Low or Out of Stock")
+    page = await db.run_sync(inventory_cruds.get_low_stock_inventory, status, cursor, limit)
+    return trusted_response(page)
+
+@router.get("/inventory/low/events")
+@no_compression
+async def stream_low_stock_events(
+    request: Request,
+    after: int = Query(None, ge=0, description="ID of the last alert received (only new alerts by default)")
+):
+    """
+    Stream the stock threshold crossings as server-sent events.
+
+    Each `threshold_crossed` event carries the item, its quantity before and after the
+    change, its reorder threshold and its new status. Reconnecting clients resume from
+    the Last-Event-ID header.
+
+    Args:
+        request (Request): Incoming request.
+        after (int): ID of the last alert received (optional).
+
+    Returns:
+        StreamingResponse: Stream of `text/event-stream` events.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if after is None and last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+    return StreamingResponse(
+        stream_stock_alerts(request, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/inventory/as_of", response_model=InventoryAsOf)
+async def get_inventory_as_of(
+    ts: datetime = Query(..., description="Point in time (ISO 8601)"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Get the quantity and status of every inventory item at a point in time.
+
+    Args:
+        ts (datetime): Point in time.
+        db (AsyncSession): Database session.
+
+    Returns:
+        InventoryAsOf: State of each inventory item that existed at that time.
+    """
+    return await db.run_sync(inventory_cruds.get_inventory_as_of, ts)
+
+@router.post("/inventory/snapshots", response_model=GetInventorySnapshot)
+async def create_inventory_snapshot(db: AsyncSession = Depends(get_async_db)):
+    """
+    Take a checkpoint of the state of every inventory item for point-in-time queries.
+
+    Args:
+        db (AsyncSession): Database session.
+
+    Returns:
+        GetInventorySnapshot: Created checkpoint.
+    """
+    return await db.run_sync(inventory_cruds.create_inventory_snapshot)
 
 @router.get("/inventory_history/{inventory_id}", response_model=PaginatedInventory)
 async def get_inventory_history(
     inventory_id: int,
     page: int = Query(1, ge=1),
-    per_page: int = Query(10, ge=1),
-    db: Session = Depends(get_db)
+    per_page: int = Query(10, ge=1, le=1000),
+    before_id: int = Query(None, description="next_before_id of the previous page, for constant-cost paging"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get all inventory history items.
 
     Args:
         inventory_id (int): ID of the inventory item.
-        page (int): Page number.
+        page (int): Page number (ignored when before_id is given).
         per_page (int): Items per page.
-        db (Session): Database session.
+        before_id (int): ID of the last history entry of the previous page (optional).
+        db (AsyncSession): Database session.
 
     Returns:
         PaginatedInventory: List of paginated inventory history items.
     """
-    return inventory_cruds.get_inventory_history(db, inventory_id, page, per_page)
+    return await db.run_sync(inventory_cruds.get_inventory_history, inventory_id, page, per_page, before_id)
 
 @router.patch("/inventory/{inventory_id}", response_model=GetInventory)
 async def update_inventory(
     inventory_id: int,
     update_data: UpdateInventory,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update an inventory item.
@@ -54,15 +173,44 @@ async def update_inventory(
     Args:
         inventory_id (int): ID of the inventory item to update.
         update_data (UpdateInventory): Data for updating the inventory item.
-        db (Session): Database session.
+        db (AsyncSession): Database session.
 
     Returns:
         GetInventory: Updated inventory item.
     """
-    existing_inventory = inventory_cruds.get_inventory_by_id(db, inventory_id)
+    existing_inventory = await db.run_sync(inventory_cruds.get_inventory_by_id, inventory_id)
 
     if not existing_inventory:
         raise HTTPException(404, detail="Inventory not found")
 
-    updated_inventory = inventory_cruds.update_inventory(db, inventory_id, update_data)
+    await db.run_sync(inventory_cruds.update_inventory, inventory_id, update_data)
+    updated_inventory = await db.run_sync(inventory_cruds.get_inventory_totals_by_id, inventory_id)
+    await db.commit()
     return updated_inventory
+
+@router.post("/inventory/{inventory_id}/shards", response_model=GetInventory)
+async def reshard_inventory(
+    inventory_id: int,
+    reshard_data: ReshardInventory,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Spread the stock of an inventory item over stock counter shards, rebalance them, or collapse them.
+
+    Sharding lets concurrent sales of a best-selling product lock different rows.
+    A shard count of 0 or 1 moves the stock back into the inventory row.
+
+    Args:
+        inventory_id (int): ID of the inventory item.
+        reshard_data (ReshardInventory): New number of shards.
+        db (AsyncSession): Database session.
+
+    Returns:
+        GetInventory: Inventory item with its total quantity.
+    """
+    inventory = await db.run_sync(inventory_cruds.reshard_inventory, inventory_id, reshard_data.shard_count)
+
+    if not inventory:
+        raise HTTPException(404, detail="Inventory not found")
+
+    return inventory
@@ -0,0 +1,260 @@
+import logging
+import threading
+import time
+from collections import deque
+from decouple import config
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.orm import Session
+from api.inventory import models
+from db.pool_metrics import WAIT_TIME_BUCKETS
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------ Inventory History Writer ---------------------------------------------
+
+# "sync" writes history in the transaction of the stock change, "batched" hands it to the background writer
+HISTORY_WRITE_MODE = config("HISTORY_WRITE_MODE", default="sync")
+# The background writer flushes every interval, or as soon as a full batch is waiting
+HISTORY_FLUSH_INTERVAL_MS = config("HISTORY_FLUSH_INTERVAL_MS", default=200, cast=int)
+HISTORY_FLUSH_BATCH_SIZE = config("HISTORY_FLUSH_BATCH_SIZE", default=500, cast=int)
+# Past this many queued entries new history is written synchronously again
+HISTORY_QUEUE_SIZE = config("HISTORY_QUEUE_SIZE", default=10000, cast=int)
+# Attempts made to write a batch before its entries are dropped
+HISTORY_FLUSH_ATTEMPTS = config("HISTORY_FLUSH_ATTEMPTS", default=3, cast=int)
+
+# Key of the history entries waiting for the commit of a session
+PENDING_HISTORY_KEY = "pending_inventory_history"
+
+
+class HistoryWriter:
+    """
+    Background thread writing inventory history entries with multi-row inserts.
+
+    Entries are queued once the transaction that produced them commits, and written in
+    batches of at most `batch_size` rows every `flush_interval` seconds, or as soon as a
+    full batch is waiting. Stopping the writer drains the queue before returning.
+    """
+    def __init__(self, session_factory, flush_interval, batch_size, max_queue_size, flush_attempts):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue_size = max_queue_size
+        self.flush_attempts = flush_attempts
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._closed = True
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.sync_writes = 0
+        self.flush_errors = 0
+        self.flush_count = 0
+        self.flush_sum = 0.0
+        self.flush_max = 0.0
+        self.flush_buckets = [0] * (len(WAIT_TIME_BUCKETS) + 1)
+
+    def is_running(self):
+        """
+        Check whether the writer thread accepts entries.
+        """
+        return self._thread is not None and not self._stopping
+
+    def is_saturated(self):
+        """
+        Check whether the queue reached its maximum size.
+        """
+        return len(self._queue) >= self.max_queue_size
+
+    def start(self):
+        """
+        Start the writer thread.
+        """
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="inventory-history-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop the writer thread once every queued entry is written.
+
+        Args:
+            timeout (float): Maximum time to wait for the queue to drain, in seconds.
+        """
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def enqueue(self, rows):
+        """
+        Queue history entries for the next flush.
+
+        Entries arriving after the writer thread exited are written immediately.
+
+        Args:
+            rows (List[Dict]): Column values of the history entries.
+        """
+        with self._condition:
+            self.enqueued += len(rows)
+            if not self._closed:
+                self._queue.extend(rows)
+                if len(self._queue) >= self.batch_size:
+                    self._condition.notify()
+                return
+        self._flush(rows)
+
+    def record_sync_write(self, count):
+        """
+        Count entries written synchronously because the queue was full.
+        """
+        with self._condition:
+            self.sync_writes += count
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if not self._queue:
+                    if self._stopping:
+                        self._closed = True
+                        return
+                    continue
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            self._flush(batch)
+
+    def _flush(self, rows):
+        for attempt in range(1, self.flush_attempts + 1):
+            start = time.perf_counter()
+            try:
+                with self.session_factory() as db:
+                    db.execute(insert(models.InventoryHistory).values(rows))
+                    db.commit()
+            except Exception:
+                logger.exception("Writing %d inventory history entries failed (attempt %d)", len(rows), attempt)
+                with self._condition:
+                    self.flush_errors += 1
+                if attempt < self.flush_attempts:
+                    time.sleep(self.flush_interval)
+                continue
+            self._observe_flush(time.perf_counter() - start, len(rows))
+            return
+        with self._condition:
+            self.dropped += len(rows)
+
+    def _observe_flush(self, seconds, count):
+        bucket = next((index for index, bound in enumerate(WAIT_TIME_BUCKETS) if seconds <= bound),
+                      len(WAIT_TIME_BUCKETS))
+        with self._condition:
+            self.written += count
+            self.flush_count += 1
+            self.flush_sum += seconds
+            self.flush_max = max(self.flush_max, seconds)
+            self.flush_buckets[bucket] += 1
+
+    def snapshot(self):
+        """
+        Get the current values of the writer metrics.
+
+        Returns:
+            Dict: Queue depth, entry counters and the flush latency histogram.
+        """
+        with self._condition:
+            histogram = {}
+            cumulative = 0
+            for bound, count in zip(WAIT_TIME_BUCKETS + ("inf",), self.flush_buckets):
+                cumulative += count
+                histogram[f"le_{bound}"] = cumulative
+            return {
+                "running": self.is_running(),
+                "queue_depth": len(self._queue),
+                "max_queue_size": self.max_queue_size,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "sync_writes": self.sync_writes,
+                "flush_errors": self.flush_errors,
+                "flush_seconds": {
+                    "count": self.flush_count,
+                    "sum": self.flush_sum,
+                    "max": self.flush_max,
+                    "histogram": histogram,
+                },
+            }
+
+
+history_writer = HistoryWriter(
+    SessionLocal,
+    flush_interval=HISTORY_FLUSH_INTERVAL_MS / 1000,
+    batch_size=HISTORY_FLUSH_BATCH_SIZE,
+    max_queue_size=HISTORY_QUEUE_SIZE,
+    flush_attempts=HISTORY_FLUSH_ATTEMPTS,
+)
+
+# Function to start the background writer when the batched mode is enabled
+def start_history_writer():
+    """
+    Start the background history writer if HISTORY_WRITE_MODE is "batched".
+    """
+    if HISTORY_WRITE_MODE == "batched":
+        history_writer.start()
+
+# Function to stop the background writer
+def stop_history_writer():
+    """
+    Write every queued history entry and stop the background writer.
+    """
+    history_writer.stop()
+
+# Function to record inventory history entries
+def record_inventory_history(db: Session, rows):
+    """
+    Record inventory history entries for the current transaction.
+
+    In the default synchronous mode the entries are inserted in the caller's transaction.
+    In batched mode they are timestamped now and queued for the background writer when
+    the transaction commits, and discarded if it rolls back. Both modes take the time
+    from the database clock, like the rest of the inventory history. When the writer is not
+    running (e.g. in scripts) or its queue is full, entries are written synchronously.
+
+    Args:
+        db (Session): Database session.
+        rows (List[Dict]): inventory_id, quantity and status of each entry.
+    """
+    if not rows:
+        return
+    if not history_writer.is_running() or history_writer.is_saturated():
+        if history_writer.is_running():
+            history_writer.record_sync_write(len(rows))
+        db.execute(insert(models.InventoryHistory), rows)
+        return
+    recorded_at = db.scalar(select(func.now()))
+    db.info.setdefault(PENDING_HISTORY_KEY, []).extend(
+        {**row, "last_updated": recorded_at} for row in rows
+    )
+
+
+# Queue the pending entries once the outermost transaction commits
+@event.listens_for(Session, "after_commit")
+def enqueue_pending_history(session):
+    if session.get_nested_transaction() is not None:
+        return
+    rows = session.info.pop(PENDING_HISTORY_KEY, None)
+    if rows:
+        history_writer.enqueue(rows)
+
+
+# Discard the pending entries when the outermost transaction ends without committing
+@event.listens_for(Session, "after_transaction_end")
+def discard_pending_history(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(PENDING_HISTORY_KEY, None)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.types import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
 from utils.enums import InventoryStatus
@@ -6,6 +6,9 @@ from sqlalchemy.sql import func
 from db.base import Base
 from db.session import engine
 
+# Quantity at or below which an item is low on stock, unless its reorder threshold is set
+DEFAULT_REORDER_THRESHOLD = 2
+
 # Define the Inventory model (tracks the current state of inventory for each product)
 class Inventory(Base):
     """
@@ -17,22 +20,31 @@ class Inventory(Base):
         quantity (int): Current quantity of the product in the inventory.
         last_updated (DateTime): Timestamp of the last update to the inventory.
         status (Enum): Status of the inventory item (e.g., IN_STOCK, OUT_OF_STOCK).
+        shard_count (int): Number of stock counter shards, 0 when the stock is kept in `quantity`.
+        reorder_threshold (int): Quantity at or below which the item is low on stock.
 
     Relationships:
         - product: One-to-One relationship with the associated product.
         - sales: One-to-Many relationship with sales made for this product.
         - history: One-to-Many relationship with historical changes in inventory.
+        - shards: One-to-Many relationship with the stock counter shards.
     """
     __tablename__ = "inventory"
+    # Serves the low stock listing without scanning the catalog
+    __table_args__ = (Index("ix_inventory_status_id", "status", "id"),)
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(ForeignKey("products.id", ondelete='CASCADE'), unique=True)
     quantity = Column(Integer)
     last_updated = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
     status = Column(SQLAlchemyEnum(InventoryStatus), nullable=False)
+    shard_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reorder_threshold = Column(Integer, nullable=False, default=DEFAULT_REORDER_THRESHOLD,
+                               server_default=str(DEFAULT_REORDER_THRESHOLD))
 
     product = relationship('Product', back_populates='inventory')
     sales = relationship('Sale', back_populates='inventory')
     history = relationship('InventoryHistory', back_populates='inventory')
+    shards = relationship('InventoryShard', back_populates='inventory', cascade='all, delete-orphan')
 
 
 # Define the InventoryHistory model (logs historical changes in inventory)
@@ -51,15 +63,164 @@ class InventoryHistory(Base):
         - inventory: Many-to-One relationship with the associated inventory item.
     """
     __tablename__ = "inventory_history"
+    __table_args__ = (
+        Index("ix_inventory_history_inventory_id_id", "inventory_id", "id"),
+        Index("ix_inventory_history_inventory_id_last_updated", "inventory_id", "last_updated"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     inventory_id = Column(ForeignKey("inventory.id", ondelete='CASCADE'))
     quantity = Column(Integer)
-    last_updated = Column(DateTime(timezone=True), default=func.now())
+    last_updated = Column(DateTime(timezone=True), default=func.now(), index=True)
     status = Column(SQLAlchemyEnum(InventoryStatus), nullable=False)
 
     inventory = relationship('Inventory', back_populates='history')
 
 
+# Define the InventoryHistoryArchive model (raw history removed by the retention job)
+class InventoryHistoryArchive(Base):
+    """
+    Represents a raw inventory history entry moved out of `inventory_history` by the retention job.
+
+    The timestamp is part of the primary key so the table can be partitioned by month on
+    MySQL, and old months dropped as whole partitions. There is no foreign key, which
+    partitioned InnoDB tables do not support.
+
+    Attributes:
+        id (int): ID of the entry in `inventory_history`.
+        inventory_id (int): ID of the associated inventory item.
+        quantity (int): Quantity at the time of the historical record.
+        last_updated (DateTime): Timestamp of the historical record.
+        status (Enum): Status of the inventory item at the time of the historical record.
+    """
+    __tablename__ = "inventory_history_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    last_updated = Column(DateTime(timezone=True), primary_key=True)
+    inventory_id = Column(Integer, nullable=False)
+    quantity = Column(Integer)
+    status = Column(SQLAlchemyEnum(InventoryStatus), nullable=False)
+
+
+# Define the HistoryRetentionCheckpoint model (progress of the history retention job)
+class HistoryRetentionCheckpoint(Base):
+    """
+    Represents the progress of a resumable history retention job.
+
+    Attributes:
+        job (str): Name of the job.
+        processed_until (DateTime): History recorded before this time has been compacted.
+        updated_at (DateTime): Timestamp of the last progress update.
+    """
+    __tablename__ = "history_retention_checkpoints"
+    job = Column(String(64), primary_key=True)
+    processed_until = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+
+# Define the InventoryShard model (one slot of a sharded stock counter)
+class InventoryShard(Base):
+    """
+    Represents one slot of the sharded stock counter of an inventory item.
+
+    Hot items can spread their stock over several slots so concurrent sales lock
+    different rows. The stock of a sharded item is the sum of its slots.
+
+    Attributes:
+        id (int): Primary key.
+        inventory_id (int): Foreign key referencing the associated inventory item.
+        slot (int): Index of the slot, from 0 to shard_count - 1.
+        quantity (int): Quantity held by the slot.
+
+    Relationships:
+        - inventory: Many-to-One relationship with the associated inventory item.
+    """
+    __tablename__ = "inventory_shards"
+    __table_args__ = (UniqueConstraint("inventory_id", "slot", name="uq_inventory_shards_slot"),)
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_id = Column(ForeignKey("inventory.id", ondelete='CASCADE'), nullable=False)
+    slot = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+
+    inventory = relationship('Inventory', back_populates='shards')
+
+
+# Define the InventorySnapshot model (checkpoint of the state of every inventory item)
+class InventorySnapshot(Base):
+    """
+    Represents a checkpoint of the quantity and status of every inventory item.
+
+    Point-in-time queries start from the latest checkpoint before the requested time
+    and apply the history recorded since, instead of reading the whole history.
+
+    Attributes:
+        id (int): Primary key.
+        taken_at (DateTime): Database timestamp at which the checkpoint was taken.
+
+    Relationships:
+        - items: One-to-Many relationship with the state of each inventory item.
+    """
+    __tablename__ = "inventory_snapshots"
+    id = Column(Integer, primary_key=True, index=True)
+    taken_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    items = relationship('InventorySnapshotItem', back_populates='snapshot', cascade='all, delete-orphan')
+
+
+# Define the InventorySnapshotItem model (state of one inventory item in a checkpoint)
+class InventorySnapshotItem(Base):
+    """
+    Represents the state of one inventory item in a checkpoint.
+
+    The inventory id is not a foreign key so checkpoints keep items deleted afterwards.
+
+    Attributes:
+        id (int): Primary key.
+        snapshot_id (int): Foreign key referencing the checkpoint.
+        inventory_id (int): ID of the inventory item.
+        quantity (int): Total quantity of the inventory item at the checkpoint.
+        status (Enum): Status of the inventory item at the checkpoint.
+
+    Relationships:
+        - snapshot: Many-to-One relationship with the checkpoint.
+    """
+    __tablename__ = "inventory_snapshot_items"
+    __table_args__ = (Index("ix_inventory_snapshot_items_snapshot_id_inventory_id", "snapshot_id", "inventory_id"),)
+    id = Column(Integer, primary_key=True, index=True)
+    snapshot_id = Column(ForeignKey("inventory_snapshots.id", ondelete='CASCADE'), nullable=False)
+    inventory_id = Column(Integer, nullable=False)
+    quantity = Column(Integer)
+    status = Column(SQLAlchemyEnum(InventoryStatus), nullable=False)
+
+    snapshot = relationship('InventorySnapshot', back_populates='items')
+
+
+# Define the InventoryAlert model (stock threshold crossings of inventory items)
+class InventoryAlert(Base):
+    """
+    Represents a stock threshold crossing of an inventory item.
+
+    An alert is written in the transaction of the stock change whenever the total
+    quantity moves between the available, low (at or below the reorder threshold) and
+    out of stock ranges. Alerts are streamed in ID order.
+
+    Attributes:
+        id (int): Primary key.
+        inventory_id (int): Foreign key referencing the associated inventory item.
+        previous_quantity (int): Total quantity before the change.
+        quantity (int): Total quantity after the change.
+        reorder_threshold (int): Reorder threshold of the item at the time of the change.
+        status (Enum): Status of the inventory item after the change.
+        created_at (DateTime): Timestamp of the change.
+    """
+    __tablename__ = "inventory_alerts"
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_id = Column(ForeignKey("inventory.id", ondelete='CASCADE'), nullable=False, index=True)
+    previous_quantity = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    reorder_threshold = Column(Integer, nullable=False)
+    status = Column(SQLAlchemyEnum(InventoryStatus), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=func.now())
+
+
 # Try to create tables using the defined models and bind them to the engine
 try:
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,235 @@
+from datetime import date, datetime, timedelta
+from decouple import config
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+from api.inventory import models
+
+# ------------------------------ Inventory History Retention ------------------------------------------
+
+# History older than this is downsampled to the first and last entry per item and period
+HISTORY_RETENTION_DAYS = config("HISTORY_RETENTION_DAYS", default=90, cast=int)
+# Downsampling period, "day" or "week"
+HISTORY_DOWNSAMPLE_PERIOD = config("HISTORY_DOWNSAMPLE_PERIOD", default="day")
+# Archived raw history older than this is dropped (0 keeps the archive forever)
+HISTORY_ARCHIVE_RETENTION_DAYS = config("HISTORY_ARCHIVE_RETENTION_DAYS", default=0, cast=int)
+# Number of history rows moved per transaction
+HISTORY_RETENTION_BATCH_SIZE = config("HISTORY_RETENTION_BATCH_SIZE", default=1000, cast=int)
+# Number of monthly archive partitions created ahead of the current month (MySQL only)
+HISTORY_ARCHIVE_PARTITIONS_AHEAD = config("HISTORY_ARCHIVE_PARTITIONS_AHEAD", default=3, cast=int)
+
+COMPACTION_JOB = "inventory_history_compaction"
+
+# Function to compute the period a history timestamp falls into
+def get_period_bounds(moment: datetime, period: str):
+    """
+    Get the start and end of the downsampling period containing a timestamp.
+
+    Args:
+        moment (datetime): Timestamp of a history entry.
+        period (str): "day" or "week" (weeks start on Monday).
+
+    Returns:
+        Tuple[datetime, datetime]: Inclusive start and exclusive end of the period.
+    """
+    start = datetime(moment.year, moment.month, moment.day)
+    if period == "week":
+        start -= timedelta(days=start.weekday())
+        return start, start + timedelta(days=7)
+    return start, start + timedelta(days=1)
+
+# Function to downsample the history older than the retention window
+def compact_inventory_history(db: Session, retention_days: int = HISTORY_RETENTION_DAYS,
+                              period: str = HISTORY_DOWNSAMPLE_PERIOD, batch_size: int = HISTORY_RETENTION_BATCH_SIZE):
+    """
+    Downsample the inventory history older than `retention_days`.
+
+    Periods are processed oldest first. In each one, the first and last entry of every
+    item stay in `inventory_history` and the other raw entries are moved to
+    `inventory_history_archive` in transactions of at most `batch_size` rows. The end of
+    each completed period is saved, so an interrupted run resumes where it stopped, and
+    re-running a partially processed period is harmless.
+
+    Args:
+        db (Session): Database session.
+        retention_days (int): Age after which history is downsampled.
+        period (str): Downsampling period, "day" or "week".
+        batch_size (int): Maximum number of rows moved per transaction.
+
+    Returns:
+        int: Number of history entries moved to the archive.
+    """
+    history = models.InventoryHistory
+    cutoff = db.scalar(select(func.now())) - timedelta(days=retention_days)
+    checkpoint = db.get(models.HistoryRetentionCheckpoint, COMPACTION_JOB)
+    if checkpoint is None:
+        checkpoint = models.HistoryRetentionCheckpoint(job=COMPACTION_JOB)
+        db.add(checkpoint)
+
+    moved = 0
+    while True:
+        # Jump to the period of the oldest entry not compacted yet
+        oldest = select(func.min(history.last_updated))
+        if checkpoint.processed_until is not None:
+            oldest = oldest.where(history.last_updated >= checkpoint.processed_until)
+        oldest_entry = db.scalar(oldest)
+        if oldest_entry is None:
+            break
+        start, end = get_period_bounds(oldest_entry, period)
+        if end > cutoff:
+            break
+
+        moved += compact_history_period(db, start, end, batch_size)
+        checkpoint.processed_until = end
+        db.commit()
+
+    db.commit()
+    return moved
+
+# Function to downsample the history of one period
+def compact_history_period(db: Session, start: datetime, end: datetime, batch_size: int):
+    """
+    Keep the first and last history entry of every item in a period and archive the others.
+
+    Args:
+        db (Session): Database session.
+        start (datetime): Inclusive start of the period.
+        end (datetime): Exclusive end of the period.
+        batch_size (int): Maximum number of rows moved per transaction.
+
+    Returns:
+        int: Number of history entries moved to the archive.
+    """
+    history = models.InventoryHistory
+    in_period = (history.last_updated >= start, history.last_updated < end)
+    kept = set()
+    for first_id, last_id in db.execute(
+        select(func.min(history.id), func.max(history.id)).where(*in_period).group_by(history.inventory_id)
+    ):
+        kept.update((first_id, last_id))
+
+    moved = 0
+    last_seen = 0
+    while True:
+        ids = db.scalars(
+            select(history.id).where(*in_period, history.id > last_seen).order_by(history.id).limit(batch_size)
+        ).all()
+        if not ids:
+            return moved
+        last_seen = ids[-1]
+
+        archived = [history_id for history_id in ids if history_id not in kept]
+        if archived:
+            columns = ["id", "inventory_id", "quantity", "last_updated", "status"]
+            db.execute(insert(models.InventoryHistoryArchive).from_select(
+                columns,
+                select(history.id, history.inventory_id, history.quantity, history.last_updated, history.status)
+                .where(history.id.in_(archived))
+            ))
+            db.execute(delete(history).where(history.id.in_(archived)))
+            db.commit()
+            moved += len(archived)
+
+# Function to drop archived history older than the archive retention
+def prune_history_archive(db: Session, archive_retention_days: int = HISTORY_ARCHIVE_RETENTION_DAYS,
+                          batch_size: int = HISTORY_RETENTION_BATCH_SIZE):
+    """
+    Delete archived history older than `archive_retention_days`, in bounded transactions.
+
+    On MySQL, where the archive is partitioned by month, whole months are dropped by
+    `maintain_archive_partitions` instead and this only removes the remainder.
+
+    Args:
+        db (Session): Database session.
+        archive_retention_days (int): Age after which archived history is dropped (0 keeps it forever).
+        batch_size (int): Maximum number of rows deleted per transaction.
+
+    Returns:
+        int: Number of archived entries deleted.
+    """
+    if not archive_retention_days:
+        return 0
+
+    archive = models.InventoryHistoryArchive
+    cutoff = db.scalar(select(func.now())) - timedelta(days=archive_retention_days)
+    deleted = 0
+    while True:
+        ids = db.scalars(select(archive.id).where(archive.last_updated < cutoff).limit(batch_size)).all()
+        if not ids:
+            return deleted
+        deleted += db.execute(delete(archive).where(archive.id.in_(ids), archive.last_updated < cutoff)).rowcount
+        db.commit()
+
+# Function to compute the first day of the month following a date
+def next_month(day: date):
+    """
+    Get the first day of the month following a date.
+
+    Args:
+        day (date): Any date.
+
+    Returns:
+        date: First day of the next month.
+    """
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+# Function to partition the history archive by month on MySQL
+def maintain_archive_partitions(db: Session, months_ahead: int = HISTORY_ARCHIVE_PARTITIONS_AHEAD,
+                                archive_retention_days: int = HISTORY_ARCHIVE_RETENTION_DAYS):
+    """
+    Partition `inventory_history_archive` by month and drop the months past the archive retention.
+
+    The table is partitioned on first use, monthly partitions are then added ahead of the
+    current month by splitting the catch-all partition, and expired months are dropped as
+    whole partitions instead of row by row. Does nothing on other databases.
+
+    Args:
+        db (Session): Database session.
+        months_ahead (int): Number of monthly partitions kept ahead of the current month.
+        archive_retention_days (int): Age after which archived history is dropped (0 keeps it forever).
+
+    Returns:
+        List[str]: Names of the dropped partitions.
+    """
+    if db.get_bind().dialect.name != "mysql":
+        return []
+
+    table = models.InventoryHistoryArchive.__tablename__
+    now = db.scalar(select(func.now()))
+    partitions = db.scalars(
+        text("SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+             "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"),
+        {"table": table}
+    ).all()
+
+    # Monthly partitions from the oldest archived month (or the current one) to the last month ahead
+    first_month = date(now.year, now.month, 1)
+    if not partitions:
+        oldest = db.scalar(select(func.min(models.InventoryHistoryArchive.last_updated)))
+        if oldest is not None:
+            first_month = min(first_month, date(oldest.year, oldest.month, 1))
+    months = [first_month]
+    for _ in range(months_ahead + (now.year - first_month.year) * 12 + now.month - first_month.month):
+        months.append(next_month(months[-1]))
+    new_partitions = [
+        f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{next_month(month)}')"
+        for month in months if f"p{month:%Y%m}" not in partitions
+    ]
+    if not partitions:
+        db.execute(text(f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS(last_updated) "
+                        f"({', '.join(new_partitions)}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"))
+    elif new_partitions:
+        db.execute(text(f"ALTER TABLE {table} REORGANIZE PARTITION pmax "
+                        f"INTO ({', '.join(new_partitions)}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"))
+
+    # Drop the months entirely past the archive retention
+    expired = []
+    if archive_retention_days:
+        cutoff = (now - timedelta(days=archive_retention_days)).date()
+        expired = [
+            name for name in partitions
+            if name != "pmax" and next_month(datetime.strptime(name[1:], "%Y%m").date()) <= cutoff
+        ]
+        if expired:
+            db.execute(text(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}"))
+    db.commit()
+    return expired
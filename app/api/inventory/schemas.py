@@ -1,6 +1,6 @@
-from typing import List, TypeVar, Generic
-from pydantic import BaseModel
-from api.inventory.models import InventoryStatus
+from typing import List, Optional, TypeVar, Generic
+from pydantic import BaseModel, Field
+from api.inventory.models import DEFAULT_REORDER_THRESHOLD, InventoryStatus
 from datetime import datetime
 
 # ----------------------------------- Inventory Schemas ----------------------------------
@@ -13,10 +13,12 @@ class CreateInventory(BaseModel):
         product_id (int): ID of the associated product.
         quantity (int): Initial quantity of the inventory item.
         status (InventoryStatus): Status of the inventory item.
+        reorder_threshold (int): Quantity at or below which the item is low on stock.
     """
     product_id: int
     quantity: int
     status: InventoryStatus
+    reorder_threshold: int = Field(DEFAULT_REORDER_THRESHOLD, ge=0)
 
 class GetInventory(BaseModel):
     """
@@ -28,12 +30,59 @@ class GetInventory(BaseModel):
         quantity (int): Current quantity of the inventory item.
         last_updated (datetime): Timestamp when the inventory item was last updated.
         status (InventoryStatus): Status of the inventory item.
+        shard_count (int): Number of stock counter shards, 0 when the stock is not sharded.
+        reorder_threshold (int): Quantity at or below which the item is low on stock.
     """
     id: int
     product_id: int
     quantity: int
     last_updated: datetime
     status: InventoryStatus
+    shard_count: int = 0
+    reorder_threshold: int = DEFAULT_REORDER_THRESHOLD
+
+class PartialInventory(BaseModel):
+    """
+    Schema for an inventory item of a listing, holding only the requested fields.
+
+    Attributes:
+        id (int, optional): Unique identifier for the inventory item.
+        product_id (int, optional): ID of the associated product.
+        quantity (int, optional): Current quantity of the inventory item.
+        last_updated (datetime, optional): Timestamp when the inventory item was last updated.
+        status (InventoryStatus, optional): Status of the inventory item.
+        shard_count (int, optional): Number of stock counter shards.
+        reorder_threshold (int, optional): Quantity at or below which the item is low on stock.
+    """
+    id: Optional[int] = None
+    product_id: Optional[int] = None
+    quantity: Optional[int] = None
+    last_updated: Optional[datetime] = None
+    status: Optional[InventoryStatus] = None
+    shard_count: Optional[int] = None
+    reorder_threshold: Optional[int] = None
+
+class InventoryPage(BaseModel):
+    """
+    Schema for a page of inventory items.
+
+    Attributes:
+        items (List[PartialInventory]): Inventory items on the page.
+        next_cursor (int, optional): Cursor of the next page, or None on the last page.
+    """
+    items: List[PartialInventory]
+    next_cursor: Optional[int] = None
+
+class LowStockPage(BaseModel):
+    """
+    Schema for a page of inventory items low on or out of stock.
+
+    Attributes:
+        items (List[GetInventory]): Inventory items on the page.
+        next_cursor (int, optional): Cursor of the next page, or None on the last page.
+    """
+    items: List[GetInventory]
+    next_cursor: Optional[int] = None
 
 class UpdateInventory(BaseModel):
     """
@@ -41,10 +90,22 @@ class UpdateInventory(BaseModel):
 
     Attributes:
         quantity (int): New quantity for the inventory item.
-        status (InventoryStatus): New status for the inventory item.
+        status (InventoryStatus): New status for the inventory item (replaced by LOW or
+            OUT_OF_STOCK at or below the reorder threshold).
+        reorder_threshold (int, optional): New reorder threshold, unchanged if omitted.
     """
     quantity: int
     status: InventoryStatus
+    reorder_threshold: Optional[int] = Field(None, ge=0)
+
+class ReshardInventory(BaseModel):
+    """
+    Schema for changing the number of stock counter shards of an inventory item.
+
+    Attributes:
+        shard_count (int): New number of shards; 0 or 1 collapses the stock back into a single row.
+    """
+    shard_count: int = Field(ge=0, le=64)
 
 class GetInventoryHistory(BaseModel):
     """
@@ -63,6 +124,45 @@ class GetInventoryHistory(BaseModel):
     last_updated: datetime
     status: InventoryStatus
 
+class InventoryState(BaseModel):
+    """
+    Schema for the state of an inventory item at a point in time.
+
+    Attributes:
+        inventory_id (int): ID of the inventory item.
+        quantity (int): Quantity of the inventory item.
+        status (InventoryStatus): Status of the inventory item.
+    """
+    inventory_id: int
+    quantity: int
+    status: InventoryStatus
+
+class InventoryAsOf(BaseModel):
+    """
+    Schema for the state of every inventory item at a point in time.
+
+    Attributes:
+        as_of (datetime): Requested point in time.
+        checkpoint_taken_at (datetime, optional): Time of the checkpoint the states were rebuilt from.
+        items (List[InventoryState]): State of each inventory item that existed at that time.
+    """
+    as_of: datetime
+    checkpoint_taken_at: Optional[datetime] = None
+    items: List[InventoryState]
+
+class GetInventorySnapshot(BaseModel):
+    """
+    Schema for getting details of an inventory checkpoint.
+
+    Attributes:
+        id (int): Unique identifier for the checkpoint.
+        taken_at (datetime): Time the checkpoint was taken.
+        item_count (int): Number of inventory items in the checkpoint.
+    """
+    id: int
+    taken_at: datetime
+    item_count: int
+
 T = TypeVar('T')
 class PaginatedInventory(BaseModel, Generic[T]):
     """
@@ -70,9 +170,13 @@ class PaginatedInventory(BaseModel, Generic[T]):
 
     Attributes:
         page_number (int): Current page number.
-        total_pages (int): Total number of pages.
+        total_pages (int, optional): Total number of pages (not counted for keyset pages).
+        total_items (int, optional): Total number of items (not counted for keyset pages).
         items (List[T]): List of items on the current page.
+        next_before_id (int, optional): `before_id` of the next page, or None on the last page.
     """
     page_number: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    total_items: Optional[int] = None
     items: List[T]
+    next_before_id: Optional[int] = None
@@ -0,0 +1,55 @@
+from fastapi import APIRouter
+from api.inventory.history_writer import HISTORY_WRITE_MODE, history_writer
+from api.product.cache import product_cache
+from api.product.search import product_search_index
+from db.session import pool_metrics
+from utils.compression import compression_metrics
+
+router = APIRouter()
+
+# ------------------------ Monitoring Routes -----------------------------------------------------------
+
+# Endpoint to get the connection pool metrics
+@router.get("/metrics/db_pool")
+def get_db_pool_metrics():
+    """
+    Get the connection pool metrics of every database engine.
+
+    Returns:
+        Dict[str, Dict]: Pool state, event counters and checkout wait time histogram per engine.
+    """
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items() if metrics.pool is not None}
+
+# Endpoint to get the inventory history writer metrics
+@router.get("/metrics/history_writer")
+def get_history_writer_metrics():
+    """
+    Get the metrics of the batched inventory history writer.
+
+    Returns:
+        Dict: Write mode, queue depth, entry counters and flush latency histogram.
+    """
+    return {"mode": HISTORY_WRITE_MODE, **history_writer.snapshot()}
+
+# Endpoint to get the product catalog cache metrics
+@router.get("/metrics/product_cache")
+def get_product_cache_metrics():
+    """
+    Get the metrics of the product catalog cache of this worker.
+
+    Returns:
+        Dict: Cache size, catalog version and hit, miss and eviction counters, and the
+        size of the product search index.
+    """
+    return {**product_cache.snapshot(), "search_index": product_search_index.snapshot()}
+
+# Endpoint to get the response compression metrics
+@router.get("/metrics/compression")
+def get_compression_metrics():
+    """
+    Get the response compression metrics of this worker.
+
+    Returns:
+        Dict[str, Dict]: Responses seen and compressed, bytes saved and CPU time spent, per route.
+    """
+    return compression_metrics.snapshot()
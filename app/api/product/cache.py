@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import OrderedDict
+from decouple import config
+from sqlalchemy.orm import Session, make_transient_to_detached
+from api.product import models
+
+# ------------------------------ Product Catalog Cache ------------------------------------------------
+
+# Maximum number of products kept in memory per worker (0 disables the cache)
+PRODUCT_CACHE_SIZE = config("PRODUCT_CACHE_SIZE", default=10000, cast=int)
+# Minimum time between two checks of the catalog version, in seconds (0 checks on every lookup)
+PRODUCT_CACHE_CHECK_INTERVAL = config("PRODUCT_CACHE_CHECK_INTERVAL", default=1.0, cast=float)
+
+# Name of the product catalog in the catalog_versions table
+PRODUCT_CATALOG = "products"
+
+
+class ProductCache:
+    """
+    Bounded in-memory cache of products and of the product IDs of each category.
+
+    Products are kept as column values in least-recently-used order, and the category
+    index as sorted ID lists (the None key lists every product). Both are filled lazily.
+    Local writes invalidate the affected entries; writes made by other workers are
+    detected through the catalog version stamp, checked at most every `check_interval`
+    seconds, and clear the whole cache.
+    """
+    def __init__(self, max_size, check_interval):
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._products = OrderedDict()
+        self._category_ids = {}
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.version_changes = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def check_version(self, db: Session):
+        """
+        Clear the cache if another worker changed the catalog since the last check.
+
+        Args:
+            db (Session): Database session used to read the version stamp.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        version = (
+            db.query(models.CatalogVersion.version)
+            .filter(models.CatalogVersion.name == PRODUCT_CATALOG)
+            .scalar()
+        ) or 0
+        with self._lock:
+            self._checked_at = now
+            if version != self._version:
+                if self._version is not None:
+                    self.version_changes += 1
+                self._products.clear()
+                self._category_ids.clear()
+                self._version = version
+
+    def get(self, product_id):
+        """
+        Get the cached column values of a product.
+
+        Returns:
+            Dict: Column values, or None on a miss.
+        """
+        with self._lock:
+            values = self._products.get(product_id)
+            if values is None:
+                self.misses += 1
+                return None
+            self._products.move_to_end(product_id)
+            self.hits += 1
+            return values
+
+    def put(self, product: models.Product):
+        """
+        Cache the column values of a loaded product, evicting the least recently used ones.
+        """
+        values = {column.key: getattr(product, column.key) for column in models.Product.__table__.columns}
+        with self._lock:
+            self._products[product.id] = values
+            self._products.move_to_end(product.id)
+            while len(self._products) > self.max_size:
+                self._products.popitem(last=False)
+                self.evictions += 1
+        return values
+
+    def get_category_ids(self, category):
+        """
+        Get the cached sorted product IDs of a category (None for every product).
+
+        Returns:
+            List[int]: Sorted product IDs, or None on a miss.
+        """
+        with self._lock:
+            ids = self._category_ids.get(category)
+            if ids is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return ids
+
+    def put_category_ids(self, category, ids):
+        """
+        Cache the sorted product IDs of a category (None for every product).
+        """
+        with self._lock:
+            self._category_ids[category] = ids
+
+    def invalidate(self, product_id=None, category=None):
+        """
+        Drop a product and the ID lists it belongs to.
+
+        Args:
+            product_id (int): ID of the changed product (optional).
+            category (Category): Category of a product that was added or removed (optional).
+        """
+        with self._lock:
+            if product_id is not None:
+                self._products.pop(product_id, None)
+            if category is not None:
+                self._category_ids.pop(category, None)
+                self._category_ids.pop(None, None)
+            self.invalidations += 1
+
+    def snapshot(self):
+        """
+        Get the current values of the cache metrics.
+
+        Returns:
+            Dict: Cache size, catalog version and hit, miss and eviction counters.
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._products),
+                "max_size": self.max_size,
+                "cached_categories": len(self._category_ids),
+                "version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "version_changes": self.version_changes,
+            }
+
+
+product_cache = ProductCache(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_CHECK_INTERVAL)
+
+# Function to attach cached product values to a session
+def attach_cached_product(db: Session, values):
+    """
+    Turn cached column values into a product of the session without querying the database.
+
+    Args:
+        db (Session): Database session.
+        values (Dict): Cached column values of the product.
+
+    Returns:
+        Product: Persistent product, which can be updated or deleted like a loaded one.
+    """
+    product = models.Product(**values)
+    make_transient_to_detached(product)
+    return db.merge(product, load=False)
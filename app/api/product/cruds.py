@@ -1,7 +1,30 @@
-import os
-from fastapi import HTTPException, UploadFile
+import csv
+import io
+import json
+import time
+from bisect import bisect_right
+from pydantic import ValidationError
+from sqlalchemy import event, func, insert, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 from api.product import models
+from api.product.schemas import CreateProduct
+from api.inventory.models import Inventory
+from api.inventory.cruds import get_stock_status
+from api.inventory.history_writer import record_inventory_history
+from api.product.cache import PRODUCT_CATALOG, attach_cached_product, product_cache
+from api.product.search import IndexedProduct, product_search_index
+from utils.enums import Category, ExportFormat, InventoryStatus
+from utils.listing import make_etag
+
+# Columns that can be selected with the `fields` parameter of the product listing
+PRODUCT_FIELDS = ("id", "name", "description", "price", "category", "image", "last_updated")
+
+# Maximum number of row errors listed in an import report (the others are only counted)
+MAX_IMPORT_ERRORS = 1000
+
+# Key of the catalog changes waiting for their transaction to commit, in Session.info
+PENDING_CATALOG_CHANGES_KEY = "pending_catalog_changes"
 
 # ------------------------------ Product Functions ------------------------------------------
 
@@ -10,6 +33,9 @@ def create_product(db: Session, product_data):
     """
     Create a new product.
 
+    The product is flushed to get its ID but not committed; the caller commits. The
+    cache and search index of this worker are updated once the transaction commits.
+
     Args:
         db (Session): Database session.
         product_data (dict): Data for creating the product.
@@ -17,11 +43,15 @@ def create_product(db: Session, product_data):
     Returns:
         Product: Created product.
     """
-    product_data.pop('quantity')  # Remove 'quantity' from product_data
-    db_product = models.Product(**product_data)
+    # Remove the inventory fields from product_data
+    product_data.pop('quantity')
+    product_data.pop('reorder_threshold', None)
+    db_product = models.Product(**product_data, catalog_version=bump_catalog_version(db))
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    db.flush()
+    record_catalog_change(db, category=db_product.category, indexed=IndexedProduct(
+        db_product.id, db_product.name, db_product.description, db_product.category, db_product.price
+    ))
     return db_product
 
 # Function to delete a product
@@ -37,51 +67,332 @@ def delete_product(db: Session, product: models.Product):
         dict: Result of the deletion.
     """
     db.delete(product)
+    db.add(models.DeletedProduct(product_id=product.id, catalog_version=bump_catalog_version(db)))
+    record_catalog_change(db, product.id, product.category, deleted=True)
     db.commit()
     return {"ok": True}
 
+# Function to read the rows of an uploaded product file
+def read_import_rows(file, import_format: ExportFormat):
+    """
+    Read the rows of a CSV or NDJSON file one at a time.
+
+    Args:
+        file (BinaryIO): Uploaded file.
+        import_format (ExportFormat): Format of the file.
+
+    Yields:
+        Tuple[int, Dict | str]: Line number and the CSV row, or the raw NDJSON line.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if import_format == ExportFormat.CSV:
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, {key: value for key, value in row.items() if key}
+        else:
+            for line_number, line in enumerate(text, start=1):
+                if line.strip():
+                    yield line_number, line
+    finally:
+        # Leave the uploaded file open for its owner
+        text.detach()
+
+# Function to insert a batch of imported products
+def insert_product_batch(db: Session, products):
+    """
+    Insert a batch of products with their inventory items and first history entries.
+
+    Products are inserted with one multi-row statement where the database can return the
+    generated IDs of such a statement, and one statement per product otherwise; inventory
+    items and history entries are always inserted with one statement each.
+
+    Args:
+        db (Session): Database session.
+        products (List[CreateProduct]): Validated products.
+    """
+    catalog_version = bump_catalog_version(db)
+    db_products = [
+        models.Product(**product.model_dump(exclude={"quantity", "reorder_threshold"}), catalog_version=catalog_version)
+        for product in products
+    ]
+    db.add_all(db_products)
+    db.flush()
+    inventory_rows = [
+        {
+            "product_id": db_product.id,
+            "quantity": product.quantity,
+            "reorder_threshold": product.reorder_threshold,
+            "status": get_stock_status(product.quantity, InventoryStatus.AVAILABLE, product.reorder_threshold),
+        }
+        for db_product, product in zip(db_products, products)
+    ]
+    db.execute(insert(Inventory), inventory_rows)
+    inventory_ids = dict(
+        db.query(Inventory.product_id, Inventory.id)
+        .filter(Inventory.product_id.in_([db_product.id for db_product in db_products]))
+        .all()
+    )
+    record_inventory_history(db, [
+        {"inventory_id": inventory_ids[row["product_id"]], "quantity": row["quantity"], "status": row["status"]}
+        for row in inventory_rows
+    ])
+    # The products expire on commit: keep the values indexed afterwards without reloading them
+    for db_product in db_products:
+        record_catalog_change(db, category=db_product.category, indexed=IndexedProduct(
+            db_product.id, db_product.name, db_product.description, db_product.category, db_product.price
+        ))
+    db.commit()
+    db.expunge_all()
+
+# Function to import products from an uploaded file
+def import_products(db: Session, file, import_format: ExportFormat, batch_size: int):
+    """
+    Import products from a CSV or NDJSON file.
+
+    The file is read and validated against CreateProduct one row at a time, and valid
+    rows are inserted with their inventory items and history in transactions of
+    `batch_size` products, so memory use stays flat regardless of the file size. A batch
+    the database rejects is rolled back and its rows are reported as failed.
+
+    Args:
+        db (Session): Database session.
+        file (BinaryIO): Uploaded file.
+        import_format (ExportFormat): Format of the file.
+        batch_size (int): Number of products inserted per transaction.
+
+    Returns:
+        Dict: Number of imported and failed rows, the first row errors, and the throughput.
+    """
+    started = time.perf_counter()
+    report = {"imported": 0, "failed": 0, "errors": []}
+
+    def add_error(line_number, error):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_IMPORT_ERRORS:
+            report["errors"].append({"row": line_number, "error": error})
+
+    def flush_batch(batch):
+        try:
+            insert_product_batch(db, [product for _, product in batch])
+        except SQLAlchemyError as error:
+            db.rollback()
+            db.expunge_all()
+            for line_number, _ in batch:
+                add_error(line_number, f"Batch rejected by the database: {error.__class__.__name__}")
+        else:
+            report["imported"] += len(batch)
+
+    batch = []
+    for line_number, row in read_import_rows(file, import_format):
+        try:
+            if import_format == ExportFormat.CSV:
+                product = CreateProduct.model_validate(row)
+            else:
+                product = CreateProduct.model_validate_json(row)
+        except ValidationError as error:
+            add_error(line_number, "; ".join(
+                f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+                for detail in error.errors()
+            ))
+            continue
+        batch.append((line_number, product))
+        if len(batch) >= batch_size:
+            flush_batch(batch)
+            batch = []
+    if batch:
+        flush_batch(batch)
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round((report["imported"] + report["failed"]) / elapsed, 1) if elapsed else None
+    return report
+
 # Function to upload a product image
-def upload_product_image(db: Session, image: UploadFile, product: models.Product):
+def upload_product_image(db: Session, image_path: str, product: models.Product):
     """
-    Upload a product image.
+    Associate a stored image with a product.
 
     Args:
         db (Session): Database session.
-        image (UploadFile): Uploaded image file.
+        image_path (str): Path of the image, as returned by `store_image`.
         product (Product): Product to associate with the image.
 
     Returns:
         Product: Updated product with the image path.
     """
-    if image:
-        upload_dir = "uploads/products"
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, image.filename)
-        with open(file_path, "wb") as file:
-            file.write(image.file.read())
-        product.image = file_path
-        db.commit()
-        db.refresh(product)
-        return product
+    product.image = image_path
+    product.catalog_version = bump_catalog_version(db)
+    record_catalog_change(db, product.id)
+    db.commit()
+    db.refresh(product)
+    return product
+
+# Function to build the filters of the product listing
+def get_product_filters(category: Category = None):
+    """
+    Build the filters of the product listing.
 
-# Function to retrieve all products
-def get_all_products(db: Session):
+    Args:
+        category (Category): Only list products in this category (optional).
+
+    Returns:
+        List[ColumnElement]: Filter expressions on the products table.
     """
-    Get all products.
+    return [models.Product.category == category] if category is not None else []
+
+# Function to compute the entity tag of the product listing
+def get_products_etag(db: Session, category: Category = None):
+    """
+    Compute an entity tag that changes whenever the listed products change.
+
+    The tag is derived from the count and the latest update of the matching products,
+    so it costs one aggregate query and no row is loaded.
+
+    Args:
+        db (Session): Database session.
+        category (Category): Only consider products in this category (optional).
+
+    Returns:
+        str: Weak entity tag of the listing.
+    """
+    count, last_updated = (
+        db.query(func.count(models.Product.id), func.max(models.Product.last_updated))
+        .filter(*get_product_filters(category))
+        .one()
+    )
+    return make_etag(count, last_updated)
+
+# Function to retrieve a page of products
+def get_all_products(db: Session, fields=None, category: Category = None, cursor: int = None, limit: int = 100):
+    """
+    Get a page of products, ordered by ID.
+
+    With the catalog cache enabled, the page is cut from the cached ID list of the
+    category and the products are served from the cache, loading only the missing ones.
+    Otherwise only the requested columns are selected. Pages are read by keyset on the
+    ID, so every page costs O(limit).
 
     Args:
         db (Session): Database session.
+        fields (List[str]): Columns to return, from PRODUCT_FIELDS (optional, every column by default).
+        category (Category): Only list products in this category (optional).
+        cursor (int): ID of the last product of the previous page (optional).
+        limit (int): Maximum number of products per page.
 
     Returns:
-        List[Product]: List of all products.
+        Dict: Products on the page and the next cursor.
     """
-    return db.query(models.Product).all()
+    fields = fields or list(PRODUCT_FIELDS)
+    ids = get_category_product_ids(db, category)
+    if ids is not None:
+        start = bisect_right(ids, cursor) if cursor is not None else 0
+        page_ids = ids[start:start + limit]
+        items = [{name: values[name] for name in fields} for values in get_products_by_ids(db, page_ids)]
+        next_cursor = page_ids[-1] if start + limit < len(ids) else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    query = db.query(models.Product.id.label("cursor_id"), *(getattr(models.Product, name) for name in fields))
+    query = query.filter(*get_product_filters(category))
+    if cursor is not None:
+        query = query.filter(models.Product.id > cursor)
+    rows = query.order_by(models.Product.id).limit(limit + 1).all()
+
+    items = [{name: getattr(row, name) for name in fields} for row in rows[:limit]]
+    next_cursor = rows[limit - 1].cursor_id if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+# Function to retrieve the sorted product IDs of a category from the catalog cache
+def get_category_product_ids(db: Session, category: Category = None):
+    """
+    Get the sorted IDs of the products of a category through the catalog cache.
+
+    Categories with more products than the cache holds are not indexed.
+
+    Args:
+        db (Session): Database session.
+        category (Category): Category of the products (optional, every product by default).
+
+    Returns:
+        List[int]: Sorted product IDs, or None if the category is not served from the cache.
+    """
+    if not product_cache.enabled:
+        return None
+    product_cache.check_version(db)
+    ids = product_cache.get_category_ids(category)
+    if ids is None:
+        ids = [
+            product_id for (product_id,) in
+            db.query(models.Product.id)
+            .filter(*get_product_filters(category))
+            .order_by(models.Product.id)
+            .limit(product_cache.max_size + 1)
+        ]
+        if len(ids) > product_cache.max_size:
+            return None
+        product_cache.put_category_ids(category, ids)
+    return ids
+
+# Function to retrieve products by their IDs through the catalog cache
+def get_products_by_ids(db: Session, product_ids):
+    """
+    Get the column values of products, loading the ones missing from the cache in one query.
+
+    Args:
+        db (Session): Database session.
+        product_ids (List[int]): IDs of the products.
+
+    Returns:
+        List[Dict]: Column values of the existing products, in the order of `product_ids`.
+    """
+    found = {}
+    for product_id in product_ids:
+        values = product_cache.get(product_id)
+        if values is not None:
+            found[product_id] = values
+    missing = [product_id for product_id in product_ids if product_id not in found]
+    if missing:
+        for product in db.query(models.Product).filter(models.Product.id.in_(missing)):
+            found[product.id] = product_cache.put(product)
+    return [found[product_id] for product_id in product_ids if product_id in found]
+
+# Function to search products
+def search_products(db: Session, query: str, category: Category = None, min_price: float = None,
+                    max_price: float = None, offset: int = 0, limit: int = 20):
+    """
+    Search products by the tokens of their name and description.
+
+    Matching and ranking run on the in-memory search index; only the products on the
+    page are read, through the catalog cache.
+
+    Args:
+        db (Session): Database session.
+        query (str): Search text; every token must match.
+        category (Category): Only return products in this category (optional).
+        min_price (float): Only return products at or above this price (optional).
+        max_price (float): Only return products at or below this price (optional).
+        offset (int): Number of ranked results to skip.
+        limit (int): Maximum number of results to return.
+
+    Returns:
+        Dict: Total number of matches, products on the page, best first, and number of
+        matches per category.
+    """
+    product_search_index.ensure_fresh(db)
+    product_ids, total, facets = product_search_index.search(query, category, min_price, max_price, offset, limit)
+    return {
+        "total": total,
+        "items": get_products_by_ids(db, product_ids),
+        "facets": {product_category.value: count for product_category, count in facets.items()},
+    }
 
 # Function to retrieve a product by its ID
 def get_product_by_id(db: Session, product_id: int):
     """
     Get a product by its ID.
 
+    Cached products are attached to the session without querying the database.
+
     Args:
         db (Session): Database session.
         product_id (int): ID of the product.
@@ -89,4 +400,86 @@ def get_product_by_id(db: Session, product_id: int):
     Returns:
         Product: Retrieved product.
     """
-    return db.query(models.Product).filter(models.Product.id == product_id).first()
+    if product_cache.enabled:
+        product_cache.check_version(db)
+        values = product_cache.get(product_id)
+        if values is not None:
+            return attach_cached_product(db, values)
+    product = db.query(models.Product).filter(models.Product.id == product_id).first()
+    if product is not None and product_cache.enabled:
+        product_cache.put(product)
+    return product
+
+# Function to record a change to the product catalog
+def bump_catalog_version(db: Session):
+    """
+    Increment the version stamp of the product catalog in the current transaction.
+
+    Other workers compare it with the version of their cache to detect the change. The
+    stamp stays locked until the transaction ends, so versions are taken in commit order:
+    once a version is visible, every change stamped with a lower one is too.
+
+    Args:
+        db (Session): Database session.
+
+    Returns:
+        int: New version, to stamp on the changed products.
+    """
+    increment = (
+        update(models.CatalogVersion)
+        .where(models.CatalogVersion.name == PRODUCT_CATALOG)
+        .values(version=models.CatalogVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    current = (
+        db.query(models.CatalogVersion.version)
+        .filter(models.CatalogVersion.name == PRODUCT_CATALOG)
+    )
+    if db.execute(increment).rowcount:
+        return current.scalar()
+
+    # First write to the catalog: create the stamp, or fall back to the increment if a
+    # concurrent transaction created it first
+    try:
+        with db.begin_nested():
+            db.add(models.CatalogVersion(name=PRODUCT_CATALOG, version=1))
+    except IntegrityError:
+        db.execute(increment)
+    return current.scalar()
+
+# Function to record a product change for this worker's cache and search index
+def record_catalog_change(db: Session, product_id: int = None, category: Category = None,
+                          indexed: IndexedProduct = None, deleted: bool = False):
+    """
+    Record a product change to apply to this worker's cache and search index once the
+    transaction commits. The change is discarded if the transaction rolls back.
+
+    Args:
+        db (Session): Database session.
+        product_id (int): ID of the changed product, dropped from the cache (optional).
+        category (Category): Category of a product added or removed (optional).
+        indexed (IndexedProduct): Values of a product to (re)index (optional).
+        deleted (bool): Whether the product was deleted and leaves the search index.
+    """
+    db.info.setdefault(PENDING_CATALOG_CHANGES_KEY, []).append((product_id, category, indexed, deleted))
+
+
+# Apply the pending catalog changes once the outermost transaction commits
+@event.listens_for(Session, "after_commit")
+def apply_pending_catalog_changes(session):
+    if session.get_nested_transaction() is not None:
+        return
+    changes = session.info.pop(PENDING_CATALOG_CHANGES_KEY, None)
+    for product_id, category, indexed, deleted in changes or ():
+        product_cache.invalidate(product_id, category)
+        if indexed is not None:
+            product_search_index.add(indexed)
+        elif deleted:
+            product_search_index.remove(product_id)
+
+
+# Discard the pending catalog changes when the outermost transaction ends without committing
+@event.listens_for(Session, "after_transaction_end")
+def discard_pending_catalog_changes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(PENDING_CATALOG_CHANGES_KEY, None)
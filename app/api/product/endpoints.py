@@ -1,30 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from db.session import get_db
-from api.product.schemas import CreateProduct, GetProduct
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.session import get_db, get_async_db, get_async_read_db
+from api.product.schemas import CreateProduct, GetProduct, ProductImportResult, ProductPage, ProductSearchPage
 from api.inventory.schemas import CreateInventory
 from api.inventory.models import InventoryStatus
 from api.product import cruds as product_cruds
+from api.product.images import IMAGE_EXTENSIONS, get_image_extension, schedule_image_variants, store_image
 from api.inventory import cruds as inventory_cruds
+from utils.enums import Category, ExportFormat
+from utils.listing import etag_matches, parse_fields
+from utils.responses import trusted_response
 
 router = APIRouter()
 
+# Number of imported products inserted per transaction
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_BATCH_SIZE = 10000
+
 # ------------------------------ Product Routes -------------------------------------------------------
 
 # Endpoint to create a new product
 @router.post("/create_product", response_model=GetProduct)
-async def create_product(product: CreateProduct, db: Session = Depends(get_db)):
+async def create_product(product: CreateProduct, db: AsyncSession = Depends(get_async_db)):
     """
-    Create a new product.
+    Create a new product with its inventory item in a single transaction.
 
     Args:
         product (CreateProduct): Data for creating a product.
-        db (Session): Database session.
+        db (AsyncSession): Database session.
 
     Returns:
         GetProduct: Created product.
     """
-    new_product = product_cruds.create_product(db, product.model_dump())
+    new_product = await db.run_sync(product_cruds.create_product, product.model_dump())
 
     if new_product is None:
         raise HTTPException(400, detail="Could not create product")
@@ -32,18 +42,49 @@ async def create_product(product: CreateProduct, db: Session = Depends(get_db)):
     inventory = CreateInventory(
         product_id=new_product.id,
         quantity=product.quantity,
-        status=InventoryStatus.AVAILABLE
+        status=InventoryStatus.AVAILABLE,
+        reorder_threshold=product.reorder_threshold
     )
-    new_inventory = inventory_cruds.create_inventory(db, inventory.model_dump())
+    new_inventory = await db.run_sync(inventory_cruds.create_inventory, inventory.model_dump())
 
     if new_inventory is None:
         raise HTTPException(400, detail="Could not create inventory")
 
+    await db.commit()
     return new_product
 
+# Endpoint to import products from a file
+@router.post("/products/import", response_model=ProductImportResult)
+def import_products(
+    file: UploadFile = File(...),
+    import_format: ExportFormat = Query(None, alias="format", description="File format, from the file extension by default"),
+    batch_size: int = Query(DEFAULT_IMPORT_BATCH_SIZE, ge=1, le=MAX_IMPORT_BATCH_SIZE,
+                            description="Number of products inserted per transaction"),
+    db: Session = Depends(get_db)
+):
+    """
+    Import products, with their inventory items, from a CSV or NDJSON file.
+
+    Every row holds the fields of POST /create_product (name, description, price,
+    quantity, category). The file is processed as a stream and inserted in batches, so
+    rows before a rejected batch stay imported.
+
+    Args:
+        file (UploadFile): CSV file with a header row, or NDJSON file.
+        import_format (ExportFormat): Format of the file (optional).
+        batch_size (int): Number of products inserted per transaction.
+        db (Session): Database session.
+
+    Returns:
+        ProductImportResult: Imported and rejected row counts, row errors and throughput.
+    """
+    if import_format is None:
+        import_format = ExportFormat.CSV if (file.filename or "").lower().endswith(".csv") else ExportFormat.NDJSON
+    return product_cruds.import_products(db, file.file, import_format, batch_size)
+
 # Endpoint to delete a product
 @router.delete('/delete/{product_id}', response_model=GetProduct)
-def delete_product(product_id, db: Session = Depends(get_db)):
+def delete_product(product_id: int, db: Session = Depends(get_db)):
     """
     Delete a product (deleting the product will also delete corresponding inventory and its history).
 
@@ -64,37 +105,101 @@ def delete_product(product_id, db: Session = Depends(get_db)):
 
 # Endpoint to upload an image for a product
 @router.post('/upload/product_image', response_model=GetProduct)
-async def upload_product_image(product_id: int, image: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_product_image(
+    product_id: int,
+    background_tasks: BackgroundTasks,
+    image: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Upload an image for a product.
 
+    The image is copied to the storage in chunks from a worker thread and named after
+    its content hash, so identical images are stored once. Its resized variants are
+    generated in worker processes after the response is sent.
+
     Args:
         product_id (int): ID of the product.
+        background_tasks (BackgroundTasks): Tasks run after the response.
         image (UploadFile): The image file to upload.
-        db (Session): Database session.
+        db (AsyncSession): Database session.
 
     Returns:
         GetProduct: The updated product details.
 
     Raises:
-        HTTPException: If the product is not found.
+        HTTPException: If the product is not found or the file is not a supported image.
     """
-    product = product_cruds.get_product_by_id(db, product_id)
+    extension = get_image_extension(image.filename)
+    if extension is None:
+        raise HTTPException(400, detail=f"Unsupported image type, expected one of {list(IMAGE_EXTENSIONS)}")
+    product = await db.run_sync(product_cruds.get_product_by_id, product_id)
     if product is None:
         raise HTTPException(400, detail="Could not find product")
-    updated_product = product_cruds.upload_product_image(db=db, image=image, product=product)
+    image_path = await run_in_threadpool(store_image, image.file, extension)
+    updated_product = await db.run_sync(product_cruds.upload_product_image, image_path=image_path, product=product)
+    background_tasks.add_task(schedule_image_variants, image_path)
     return updated_product
 
 # Endpoint to get all products
-@router.get("/products")
-async def get_all_products(db: Session = Depends(get_db)):
+@router.get("/products", response_model=ProductPage, response_model_exclude_unset=True)
+async def get_all_products(
+    request: Request,
+    response: Response,
+    fields: str = Query(None, description="Comma-separated fields to return (e.g. id,name,price)"),
+    category: Category = Query(None, description="Filter by category"),
+    cursor: int = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of products per page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """
-    Get all products.
+    Get a page of products.
+
+    The response carries an ETag; when the If-None-Match header matches it, the products
+    are not read and 304 Not Modified is returned.
 
     Args:
-        db (Session): Database session.
+        fields (str): Comma-separated fields to return (optional, every field by default).
+        category (Category): Optional filter by category.
+        cursor (int): Cursor of the page to fetch (optional, first page if omitted).
+        limit (int): Maximum number of products per page.
+        db (AsyncSession): Database session.
+
+    Returns:
+        ProductPage: Products on the page and the cursor of the next page.
+    """
+    fields = parse_fields(fields, product_cruds.PRODUCT_FIELDS)
+    etag = await db.run_sync(product_cruds.get_products_etag, category)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    page = await db.run_sync(product_cruds.get_all_products, fields, category, cursor, limit)
+    return trusted_response(page, response)
+
+# Endpoint to search products
+@router.get("/products/search", response_model=ProductSearchPage)
+async def search_products(
+    q: str = Query(..., min_length=1, description="Words to find in the product name or description"),
+    category: Category = Query(None, description="Filter by category"),
+    min_price: float = Query(None, ge=0, description="Minimum price"),
+    max_price: float = Query(None, ge=0, description="Maximum price"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Search products by name and description, best match first.
+
+    Args:
+        q (str): Words that every returned product contains.
+        category (Category): Optional filter by category.
+        min_price (float): Optional minimum price.
+        max_price (float): Optional maximum price.
+        offset (int): Number of results to skip.
+        limit (int): Maximum number of results.
+        db (AsyncSession): Database session.
 
     Returns:
-        List[GetProduct]: List of products.
+        ProductSearchPage: Matching products with the number of matches per category.
     """
-    return product_cruds.get_all_products(db)
+    return await db.run_sync(product_cruds.search_products, q, category, min_price, max_price, offset, limit)
@@ -0,0 +1,232 @@
+import gzip
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------ Product Image Storage ------------------------------------------------
+
+# Directory holding the product images, relative to the application directory (served at /uploads)
+IMAGE_UPLOAD_DIR = "uploads/products"
+# Number of processes generating the resized variants (0 disables the variants)
+IMAGE_VARIANT_WORKERS = config("IMAGE_VARIANT_WORKERS", default=2, cast=int)
+
+# Size of the chunks copied from the upload to the storage
+IMAGE_CHUNK_SIZE = 1024 * 1024
+# Accepted image file extensions
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+# Resized WebP variants generated for each image, by name and maximum width and height
+IMAGE_VARIANTS = {"thumbnail": 200, "medium": 800}
+IMAGE_VARIANT_QUALITY = 80
+# Precompressed copies are kept only when they save at least this fraction of the size
+PRECOMPRESS_MIN_SAVING = 0.1
+
+# Content-addressed image paths: <dir>/<first 2 hex digits>/<sha256><extension>
+CONTENT_ADDRESSED_IMAGE = re.compile(r"^(?P<stem>.*/[0-9a-f]{2}/[0-9a-f]{64})\.[a-z]+$")
+
+_variant_pool = None
+# Guards the creation and shutdown of the pool, which upload worker threads race for
+_variant_pool_lock = threading.Lock()
+
+
+# Function to check the extension of an uploaded image
+def get_image_extension(filename):
+    """
+    Get the normalized extension of an uploaded image file name.
+
+    Args:
+        filename (str): Name of the uploaded file.
+
+    Returns:
+        str: Lowercase extension (e.g. ".png"), or None if it is not an accepted image type.
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if extension in IMAGE_EXTENSIONS else None
+
+# Function to store an uploaded image under its content hash
+def store_image(file, extension):
+    """
+    Copy an uploaded image to the storage, named after the SHA-256 of its content.
+
+    The upload is copied in chunks to a temporary file, which is then renamed into place,
+    so memory use is bounded and readers never see a partial image. Identical images are
+    stored once. This blocks; call it from a worker thread.
+
+    Args:
+        file (BinaryIO): Uploaded file.
+        extension (str): Extension of the stored file (e.g. ".png").
+
+    Returns:
+        str: Path of the stored image, relative to the application directory.
+    """
+    os.makedirs(IMAGE_UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=IMAGE_UPLOAD_DIR, prefix=".upload-", delete=False) as temporary:
+        try:
+            while chunk := file.read(IMAGE_CHUNK_SIZE):
+                digest.update(chunk)
+                temporary.write(chunk)
+        except BaseException:
+            os.unlink(temporary.name)
+            raise
+
+    content_hash = digest.hexdigest()
+    directory = os.path.join(IMAGE_UPLOAD_DIR, content_hash[:2])
+    path = os.path.join(directory, content_hash + extension)
+    if os.path.exists(path):
+        os.unlink(temporary.name)
+    else:
+        os.makedirs(directory, exist_ok=True)
+        os.chmod(temporary.name, 0o644)
+        os.replace(temporary.name, path)
+    return path
+
+# Function to build the path of a resized variant of an image
+def get_variant_path(image_path, name):
+    """
+    Get the path of a resized variant of a content-addressed image.
+
+    Args:
+        image_path (str): Path of the original image.
+        name (str): Name of the variant, from IMAGE_VARIANTS.
+
+    Returns:
+        str: Path of the variant, or None if the image is not content-addressed.
+    """
+    match = CONTENT_ADDRESSED_IMAGE.match(image_path or "")
+    return f"{match.group('stem')}_{name}.webp" if match else None
+
+# Function to list the URLs of the generated variants of an image
+def get_image_variant_urls(image_path):
+    """
+    Get the URL of each resized variant generated for an image.
+
+    Args:
+        image_path (str): Path of the original image (optional).
+
+    Returns:
+        Dict[str, str]: URL of each existing variant, by variant name.
+    """
+    urls = {}
+    for name in IMAGE_VARIANTS:
+        variant_path = get_variant_path(image_path, name)
+        if variant_path is None:
+            break
+        if os.path.exists(variant_path):
+            urls[name] = "/" + variant_path
+    return urls
+
+# Function to generate the resized variants of an image (runs in a worker process)
+def generate_image_variants(image_path):
+    """
+    Generate the resized WebP variants of an image that do not exist yet.
+
+    Args:
+        image_path (str): Path of the original image.
+
+    Returns:
+        List[str]: Paths of the generated variants.
+    """
+    from PIL import Image
+
+    generated = []
+    with Image.open(image_path) as image:
+        image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        for name, size in IMAGE_VARIANTS.items():
+            variant_path = get_variant_path(image_path, name)
+            if variant_path is None or os.path.exists(variant_path):
+                continue
+            variant = image.copy()
+            variant.thumbnail((size, size))
+            temporary_path = f"{variant_path}.{os.getpid()}.tmp"
+            variant.save(temporary_path, format="WEBP", quality=IMAGE_VARIANT_QUALITY)
+            os.replace(temporary_path, variant_path)
+            generated.append(variant_path)
+    precompress_file(image_path)
+    return generated
+
+# Function to store compressed copies of a file for clients accepting them
+def precompress_file(path):
+    """
+    Store gzip (and, when the brotli package is installed, brotli) copies of a file.
+
+    Already compressed formats rarely shrink, so a copy is kept only if it saves at
+    least PRECOMPRESS_MIN_SAVING of the size. The serving route sends it as is to the
+    clients that accept its encoding.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        List[str]: Paths of the kept compressed copies.
+    """
+    with open(path, "rb") as file:
+        content = file.read()
+    compressors = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    try:
+        import brotli
+        compressors.insert(0, (".br", lambda data: brotli.compress(data, quality=11)))
+    except ImportError:
+        pass
+
+    kept = []
+    for suffix, compress in compressors:
+        compressed = compress(content)
+        if len(compressed) > len(content) * (1 - PRECOMPRESS_MIN_SAVING) or os.path.exists(path + suffix):
+            continue
+        temporary_path = f"{path}{suffix}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(compressed)
+        os.replace(temporary_path, path + suffix)
+        kept.append(path + suffix)
+    return kept
+
+# Function to log the outcome of a variant generation
+def _log_variant_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error("Generating image variants failed: %r", error)
+
+# Function to queue the generation of the resized variants of an image
+def schedule_image_variants(image_path):
+    """
+    Generate the resized variants of an image in the worker process pool, without waiting.
+
+    Nothing is scheduled when the variants are disabled, Pillow is not installed or the
+    image is not content-addressed.
+
+    Args:
+        image_path (str): Path of the original image.
+    """
+    global _variant_pool
+    if IMAGE_VARIANT_WORKERS <= 0 or get_variant_path(image_path, next(iter(IMAGE_VARIANTS))) is None:
+        return
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return
+    with _variant_pool_lock:
+        if _variant_pool is None:
+            # Spawned rather than forked: the server process runs threads
+            _variant_pool = ProcessPoolExecutor(IMAGE_VARIANT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        _variant_pool.submit(generate_image_variants, image_path).add_done_callback(_log_variant_failure)
+
+# Function to stop the variant worker processes
+def shutdown_image_workers():
+    """
+    Wait for the queued variant generations and stop the worker processes.
+    """
+    global _variant_pool
+    with _variant_pool_lock:
+        pool, _variant_pool = _variant_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
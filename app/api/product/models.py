@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Float, Integer, String
+from sqlalchemy import Column, DateTime, Float, Integer, String
 from sqlalchemy.types import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from utils.enums import Category
 from db.base import Base
 from db.session import engine
@@ -17,6 +18,9 @@ class Product(Base):
         price (float): Price of the product.
         category (Enum): Category of the product (e.g., ELECTRONICS, CLOTHING).
         image (str): Path to the product image.
+        last_updated (DateTime): Timestamp of the last update to the product.
+        catalog_version (int): Version of the product catalog written with the last change
+            to the product.
 
     Relationships:
         - inventory: One-to-One relationship with the associated inventory item.
@@ -28,11 +32,51 @@ class Product(Base):
     price = Column(Float, index=True)
     category = Column(SQLAlchemyEnum(Category), nullable=False)
     image = Column(String(255), index=True)
+    # Set in Python so the value is known after a flush without reloading the row
+    last_updated = Column(DateTime(timezone=True), default=datetime.now, onupdate=datetime.now, index=True)
+    catalog_version = Column(Integer, index=True)
     
     # Add a relationship to Inventory (One-to-One relationship)
     inventory = relationship('Inventory', uselist=False, cascade='all, delete-orphan', back_populates='product')
 
 
+# Define the CatalogVersion model (version stamp of cached data, shared by every worker)
+class CatalogVersion(Base):
+    """
+    Represents the version stamp of a catalog cached in memory by the workers.
+
+    Every write to the catalog increments the version in the same transaction, so a
+    worker notices that its cache is stale by reading one row.
+
+    Attributes:
+        name (str): Primary key, name of the catalog (e.g. "products").
+        version (int): Number of writes to the catalog.
+    """
+    __tablename__ = "catalog_versions"
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# Define the DeletedProduct model (products removed from the catalog)
+class DeletedProduct(Base):
+    """
+    Represents a product removed from the catalog.
+
+    Workers read the deletions made since the catalog version of their search index to
+    drop the deleted products from it. A product ID may be deleted more than once when
+    the database reuses IDs (e.g. SQLite after the highest ID is deleted).
+
+    Attributes:
+        id (int): Primary key.
+        product_id (int): ID of the deleted product.
+        catalog_version (int): Version of the product catalog written with the deletion.
+    """
+    __tablename__ = "deleted_products"
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, nullable=False)
+    catalog_version = Column(Integer, nullable=False, index=True)
+
+
 # Try to create tables using the defined models and bind them to the engine
 try:
     Base.metadata.create_all(bind=engine)
@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field
 from api.product.models import Category
-from typing import Optional
+from api.product.images import get_image_variant_urls
+from api.inventory.models import DEFAULT_REORDER_THRESHOLD
+from typing import Dict, List, Optional
+from datetime import datetime
 
 # -------------------------- Product Schemas --------------------------------
 
@@ -15,12 +18,14 @@ class CreateProduct(BaseModel):
         quantity (int): Initial quantity of the product in inventory.
         category (Category): Category of the product.
         image (Optional[str]): Image URL or file path of the product (optional).
+        reorder_threshold (int): Quantity at or below which the product is low on stock.
     """
     name: str
     description: str = ""
     price: float
     quantity: int
     category: Category
+    reorder_threshold: int = Field(DEFAULT_REORDER_THRESHOLD, ge=0)
 
 class GetProduct(BaseModel):
     """
@@ -34,6 +39,8 @@ class GetProduct(BaseModel):
         quantity (int): Current quantity of the product in inventory.
         category (Category): Category of the product.
         image (Optional[str]): Image URL or file path of the product (optional).
+        last_updated (Optional[datetime]): Timestamp of the last update to the product (optional).
+        image_variants (Dict[str, str]): URL of each resized variant of the image generated so far.
     """
     id: int
     name: str
@@ -41,3 +48,82 @@ class GetProduct(BaseModel):
     price: float
     category: Category
     image: Optional[str] = None
+    last_updated: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def image_variants(self) -> Dict[str, str]:
+        return get_image_variant_urls(self.image)
+
+class PartialProduct(BaseModel):
+    """
+    Schema for a product of a listing, holding only the requested fields.
+
+    Attributes:
+        id (int, optional): Unique identifier for the product.
+        name (str, optional): Name of the product.
+        description (str, optional): Description of the product.
+        price (float, optional): Price of the product.
+        category (Category, optional): Category of the product.
+        image (str, optional): Image URL or file path of the product.
+        last_updated (datetime, optional): Timestamp of the last update to the product.
+    """
+    id: Optional[int] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    category: Optional[Category] = None
+    image: Optional[str] = None
+    last_updated: Optional[datetime] = None
+
+class ProductPage(BaseModel):
+    """
+    Schema for a page of products.
+
+    Attributes:
+        items (List[PartialProduct]): Products on the page.
+        next_cursor (int, optional): Cursor of the next page, or None on the last page.
+    """
+    items: List[PartialProduct]
+    next_cursor: Optional[int] = None
+
+class ProductSearchPage(BaseModel):
+    """
+    Schema for a page of product search results.
+
+    Attributes:
+        total (int): Number of products matching the query and filters.
+        items (List[GetProduct]): Products on the page, best match first.
+        facets (Dict[str, int]): Number of matching products per category, ignoring the category filter.
+    """
+    total: int
+    items: List[GetProduct]
+    facets: Dict[str, int]
+
+class ProductImportError(BaseModel):
+    """
+    Schema for a row of an import file that was not imported.
+
+    Attributes:
+        row (int): Line number of the row in the file.
+        error (str): Reason the row was rejected.
+    """
+    row: int
+    error: str
+
+class ProductImportResult(BaseModel):
+    """
+    Schema for the report of a product import.
+
+    Attributes:
+        imported (int): Number of imported products.
+        failed (int): Number of rejected rows.
+        errors (List[ProductImportError]): First rejected rows with their reason.
+        elapsed_seconds (float): Duration of the import.
+        rows_per_second (float, optional): Rows processed per second.
+    """
+    imported: int
+    failed: int
+    errors: List[ProductImportError]
+    elapsed_seconds: float
+    rows_per_second: Optional[float] = None
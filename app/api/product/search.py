@@ -0,0 +1,216 @@
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+from decouple import config
+from sqlalchemy.orm import Session
+from api.product import models
+from api.product.cache import PRODUCT_CATALOG
+
+# ------------------------------ Product Search Index -------------------------------------------------
+
+# Minimum time between two checks of the catalog version, in seconds (0 checks on every search)
+PRODUCT_SEARCH_CHECK_INTERVAL = config("PRODUCT_SEARCH_CHECK_INTERVAL", default=1.0, cast=float)
+# Number of products loaded per round trip when the index is built
+PRODUCT_SEARCH_LOAD_BATCH_SIZE = config("PRODUCT_SEARCH_LOAD_BATCH_SIZE", default=10000, cast=int)
+
+# Weight of a token found in the name, relative to one found in the description
+NAME_WEIGHT = 2
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Values of a product kept by the index, captured from a row or an ORM object
+IndexedProduct = namedtuple("IndexedProduct", ("id", "name", "description", "category", "price"))
+
+
+# Function to split a text into search tokens
+def tokenize(text):
+    """
+    Split a text into lowercase word tokens.
+
+    Args:
+        text (str): Text to split (None is treated as empty).
+
+    Returns:
+        List[str]: Tokens in text order.
+    """
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class ProductSearchIndex:
+    """
+    In-memory inverted index over the name and description of every product.
+
+    Each token maps to the products containing it with a weight (occurrences, counting
+    name occurrences NAME_WEIGHT times). The category and price of each product are kept
+    alongside for filtering and facets.
+
+    The index is built on the first search. Local product writes update it directly.
+    Writes from other workers are detected through the catalog version stamp, checked at
+    most every `check_interval` seconds, and applied by reindexing the products stamped
+    with a newer version and removing those deleted since then.
+    """
+    def __init__(self, check_interval, load_batch_size):
+        self.check_interval = check_interval
+        self.load_batch_size = load_batch_size
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._version = None
+        self._checked_at = 0.0
+        self.builds = 0
+        self.refreshes = 0
+
+    def ensure_fresh(self, db: Session):
+        """
+        Build the index, or apply the catalog changes made since the last check.
+
+        Args:
+            db (Session): Database session used to read the catalog.
+        """
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            version = (
+                db.query(models.CatalogVersion.version)
+                .filter(models.CatalogVersion.name == PRODUCT_CATALOG)
+                .scalar()
+            ) or 0
+            if self._version is None:
+                self._build(db)
+            elif version != self._version:
+                self._refresh(db, self._version)
+            self._version = version
+            self._checked_at = now
+
+    def _build(self, db: Session):
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._load(db.query(models.Product))
+        self.builds += 1
+
+    def _refresh(self, db: Session, version):
+        # Versions are taken in commit order, so no change below the indexed version is missed.
+        # Deletions are applied first: a product created again under a deleted ID is then
+        # reloaded rather than removed.
+        deleted = (
+            db.query(models.DeletedProduct.product_id)
+            .filter(models.DeletedProduct.catalog_version > version)
+        )
+        for (product_id,) in deleted:
+            self.remove(product_id)
+        self._load(db.query(models.Product).filter(models.Product.catalog_version > version))
+        self.refreshes += 1
+
+    def _load(self, query):
+        columns = query.with_entities(
+            models.Product.id, models.Product.name, models.Product.description,
+            models.Product.category, models.Product.price,
+        )
+        for row in columns.order_by(models.Product.id).yield_per(self.load_batch_size):
+            self.add(row)
+
+    def add(self, product):
+        """
+        Index a product, replacing its previous entry.
+
+        Args:
+            product (Product | Row | IndexedProduct): Product with id, name, description,
+                category and price.
+        """
+        weights = Counter(tokenize(product.description))
+        for token in tokenize(product.name):
+            weights[token] += NAME_WEIGHT
+        with self._lock:
+            self.remove(product.id)
+            for token, weight in weights.items():
+                self._postings[token][product.id] = weight
+            self._documents[product.id] = (product.category, product.price, tuple(weights))
+
+    def remove(self, product_id):
+        """
+        Remove a product from the index.
+
+        Args:
+            product_id (int): ID of the product.
+        """
+        with self._lock:
+            document = self._documents.pop(product_id, None)
+            if document is None:
+                return
+            for token in document[2]:
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(product_id, None)
+                    if not postings:
+                        del self._postings[token]
+
+    def search(self, query, category=None, min_price=None, max_price=None, offset=0, limit=20):
+        """
+        Rank the products containing every token of a query.
+
+        Scores add up the weight of each query token in the product times its inverse
+        document frequency. Facets count the matches per category, before the category
+        filter is applied.
+
+        Args:
+            query (str): Search text.
+            category (Category): Only return products in this category (optional).
+            min_price (float): Only return products at or above this price (optional).
+            max_price (float): Only return products at or below this price (optional).
+            offset (int): Number of ranked results to skip.
+            limit (int): Maximum number of results to return.
+
+        Returns:
+            Tuple[List[int], int, Dict[Category, int]]: IDs of the products on the page, best
+            first, total number of matches and number of matches per category.
+        """
+        tokens = set(tokenize(query))
+        with self._lock:
+            postings = [self._postings.get(token) for token in tokens]
+            if not tokens or not all(postings):
+                return [], 0, {}
+            postings.sort(key=len)
+            total_documents = len(self._documents)
+            idf = [math.log(1 + total_documents / len(entries)) for entries in postings]
+
+            facets = Counter()
+            scored = []
+            for product_id, weight in postings[0].items():
+                score = weight * idf[0]
+                for entries, token_idf in zip(postings[1:], idf[1:]):
+                    token_weight = entries.get(product_id)
+                    if token_weight is None:
+                        break
+                    score += token_weight * token_idf
+                else:
+                    product_category, price, _ = self._documents[product_id]
+                    if min_price is not None and (price is None or price < min_price):
+                        continue
+                    if max_price is not None and (price is None or price > max_price):
+                        continue
+                    facets[product_category] += 1
+                    if category is None or product_category == category:
+                        scored.append((score, -product_id))
+
+        top = heapq.nlargest(offset + limit, scored)[offset:]
+        return [-negated_id for _, negated_id in top], len(scored), dict(facets)
+
+    def snapshot(self):
+        """
+        Get the current size and maintenance counters of the index.
+        """
+        with self._lock:
+            return {
+                "products": len(self._documents),
+                "tokens": len(self._postings),
+                "version": self._version,
+                "builds": self.builds,
+                "refreshes": self.refreshes,
+            }
+
+
+product_search_index = ProductSearchIndex(PRODUCT_SEARCH_CHECK_INTERVAL, PRODUCT_SEARCH_LOAD_BATCH_SIZE)
@@ -1,104 +1,399 @@
-import math
+import base64
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from enum import Enum
 from fastapi import HTTPException
-from sqlalchemy import func
+from sqlalchemy import and_, case, func, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from api.sales.models import Sale
+from api.sales.models import Sale, RevenueRollup
 from api.inventory.models import Inventory
+from api.inventory.alerts import record_stock_alerts
+from api.inventory.history_writer import record_inventory_history
+from api.inventory.cruds import decrement_sharded_stock, decrement_stock, get_stock_status, get_total_quantity_column
 from api.product.models import Product
-from utils.enums import InventoryStatus
-from api.sales.schemas import SaleCreate
+from utils.enums import ExportFormat, InventoryStatus, RevenuePeriod
+from api.sales.schemas import SaleCreate, SaleBatchItemResult
+
+# Columns of a sale record, in the order of SaleResponse
+SALE_COLUMNS = (Sale.id, Sale.inventory_id, Sale.quantity_sold, Sale.unit_price, Sale.category, Sale.sale_date)
 
 # ---------------------------- Sales Functions ---------------------------------------
 
 # Function to create a new sale
-def create_sale(db: Session, inventory: Inventory, sale: SaleCreate):
+def create_sale(db: Session, sale: SaleCreate):
     """
     Create a new sale and update the inventory.
 
+    The stock is decremented with a single conditional update of the inventory row, or of
+    one of its shards for sharded items, so concurrent sales never oversell the item.
+
     Args:
         db (Session): Database session.
-        inventory (Inventory): Inventory item associated with the sale.
         sale (SaleCreate): Data for creating a new sale.
 
     Returns:
         Sale: Created sale instance.
-    """
-    # Update inventory status
-    inventory.quantity -= sale.quantity_sold
-    if inventory.quantity <= 2:
-        inventory.status = InventoryStatus.LOW
-    elif inventory.quantity == 0:
-        inventory.status = InventoryStatus.OUT_OF_STOCK
 
-    # Create and store the sale
-    db_sale = Sale(**sale.model_dump())
+    Raises:
+        HTTPException: If the inventory item does not exist or lacks the stock for the sale.
+    """
+    # Read the product price and the stock mode without locking the inventory row
+    product = (
+        db.query(Inventory.shard_count, Inventory.reorder_threshold, Product.price, Product.category)
+        .join(Product, Product.id == Inventory.product_id)
+        .filter(Inventory.id == sale.inventory_id)
+        .first()
+    )
+
+    # Decrement the stock and update the inventory status
+    if product is None:
+        decremented = False
+    elif product.shard_count:
+        decremented, change = decrement_sharded_stock(db, sale.inventory_id, product.shard_count,
+                                                      sale.quantity_sold, product.reorder_threshold)
+    else:
+        decremented = decrement_stock(db, sale.inventory_id, sale.quantity_sold)
+    if not decremented:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Invalid sale request")
+
+    if not product.shard_count:
+        # Read the new inventory state; the decremented row is read back as written
+        quantity, status, reorder_threshold = (
+            db.query(Inventory.quantity, Inventory.status, Inventory.reorder_threshold)
+            .filter(Inventory.id == sale.inventory_id)
+            .one()
+        )
+        change = {
+            "inventory_id": sale.inventory_id,
+            "previous_quantity": quantity + sale.quantity_sold,
+            "quantity": quantity,
+            "reorder_threshold": reorder_threshold,
+            "status": status,
+        }
+
+    # Create and store the sale, capturing the price and category it was sold at; it is
+    # timestamped by the database clock, like the column default and the history
+    db_sale = Sale(**sale.model_dump(), unit_price=product.price, category=product.category,
+                   sale_date=db.scalar(select(func.now())))
     db.add(db_sale)
+    # A sale taken from a single shard does not know the total of the item: its history
+    # and alerts are left to the sales that lock every shard
+    if change is not None:
+        record_inventory_history(db, [
+            {"inventory_id": sale.inventory_id, "quantity": change["quantity"], "status": change["status"]}
+        ])
+        record_stock_alerts(db, [change])
+
+    # Add the sale revenue to the rollup buckets in the same transaction
+    add_sale_to_rollups(db, db_sale.sale_date.date(), db_sale.unit_price * db_sale.quantity_sold)
     db.commit()
     db.refresh(db_sale)
     return db_sale
 
-# Function to get all sales based on the filtering
-def get_all_sale(db: Session, start_date, end_date, product_id, category):
+# Function to create a batch of sales in a single transaction
+def create_sales_batch(db: Session, sales):
     """
-    Get all sales based on optional filters.
+    Create a batch of sales and update the inventory in a single transaction.
+
+    Stock of every affected inventory item is locked and validated with one query, then
+    decremented with one set-based update. Sharded items are decremented through their
+    shards instead, every shard locked so their totals before and after the batch are
+    exact. The accepted sales, the resulting inventory history entries, the threshold
+    crossing alerts and the revenue rollups are written with bulk inserts. Sales are
+    accepted in submission order while enough stock remains.
 
     Args:
         db (Session): Database session.
-        start_date (str): Start date for filtering sales (optional).
-        end_date (str): End date for filtering sales (optional).
+        sales (List[SaleCreate]): Data for creating the sales.
+
+    Returns:
+        List[SaleBatchItemResult]: Outcome of each sale, in submission order.
+    """
+    inventory_ids = {sale.inventory_id for sale in sales}
+    stock = {
+        row.id: row
+        for row in db.query(Inventory.id, get_total_quantity_column().label("quantity"), Inventory.status,
+                            Inventory.shard_count, Inventory.reorder_threshold, Product.price, Product.category)
+        .join(Product, Product.id == Inventory.product_id)
+        .filter(Inventory.id.in_(inventory_ids))
+        .with_for_update(of=Inventory)
+    }
+
+    # Accept each sale while the remaining stock covers it. The shards are not locked by
+    # the read above, so sharded items are checked and totalled by their decrement.
+    remaining = {inventory_id: row.quantity for inventory_id, row in stock.items()}
+    sharded_changes = {}
+    results = []
+    accepted_sales = []
+    for index, sale in enumerate(sales):
+        row = stock.get(sale.inventory_id)
+        accepted = (
+            row is not None and sale.quantity_sold > 0
+            and (row.shard_count or remaining[sale.inventory_id] >= sale.quantity_sold)
+        )
+        if accepted and row.shard_count:
+            accepted, change = decrement_sharded_stock(
+                db, sale.inventory_id, row.shard_count, sale.quantity_sold, row.reorder_threshold, exact=True,
+            )
+            if accepted:
+                first_change = sharded_changes.get(sale.inventory_id, change)
+                sharded_changes[sale.inventory_id] = {**change, "previous_quantity": first_change["previous_quantity"]}
+                remaining[sale.inventory_id] = change["quantity"]
+        elif accepted:
+            remaining[sale.inventory_id] -= sale.quantity_sold
+        if accepted:
+            accepted_sales.append(sale)
+        results.append(SaleBatchItemResult(index=index, inventory_id=sale.inventory_id,
+                                           quantity_sold=sale.quantity_sold, accepted=accepted,
+                                           detail=None if accepted else "Invalid sale request"))
+
+    if not accepted_sales:
+        db.rollback()
+        return results
+
+    # Decrement the stock and update the status of every affected single-row item at once;
+    # sharded items keep the status written by their decrement
+    sold = {}
+    for sale in accepted_sales:
+        sold[sale.inventory_id] = sold.get(sale.inventory_id, 0) + sale.quantity_sold
+    statuses = {
+        inventory_id: sharded_changes[inventory_id]["status"] if inventory_id in sharded_changes
+        else get_stock_status(remaining[inventory_id], stock[inventory_id].status, stock[inventory_id].reorder_threshold)
+        for inventory_id in sold
+    }
+    unsharded = {inventory_id: quantity for inventory_id, quantity in sold.items() if not stock[inventory_id].shard_count}
+    if unsharded:
+        db.execute(
+            update(Inventory)
+            .where(Inventory.id.in_(unsharded))
+            .values(
+                quantity=Inventory.quantity - case(unsharded, value=Inventory.id),
+                status=case(
+                    {inventory_id: literal(statuses[inventory_id], Inventory.status.type) for inventory_id in unsharded},
+                    value=Inventory.id
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    # Record the sales, the new inventory states and the revenue, timestamped once by the database clock
+    sale_date = db.scalar(select(func.now()))
+    db.execute(insert(Sale), [
+        {
+            "inventory_id": sale.inventory_id,
+            "quantity_sold": sale.quantity_sold,
+            "unit_price": stock[sale.inventory_id].price,
+            "category": stock[sale.inventory_id].category,
+            "sale_date": sale_date,
+        }
+        for sale in accepted_sales
+    ])
+    record_inventory_history(db, [
+        {"inventory_id": inventory_id, "quantity": remaining[inventory_id], "status": statuses[inventory_id]}
+        for inventory_id in sold
+    ])
+    record_stock_alerts(db, [
+        sharded_changes.get(inventory_id) or {
+            "inventory_id": inventory_id,
+            "previous_quantity": stock[inventory_id].quantity,
+            "quantity": remaining[inventory_id],
+            "reorder_threshold": stock[inventory_id].reorder_threshold,
+            "status": statuses[inventory_id],
+        }
+        for inventory_id in sold
+    ])
+    revenue = sum(stock[sale.inventory_id].price * sale.quantity_sold for sale in accepted_sales)
+    add_sale_to_rollups(db, sale_date.date(), revenue)
+    db.commit()
+    return results
+
+# Function to encode the position of a sale as an opaque cursor
+def encode_sale_cursor(sale):
+    """
+    Encode the (sale_date, id) position of a sale as an opaque cursor.
+
+    Args:
+        sale (Sale | Row): Last sale of a page.
+
+    Returns:
+        str: URL-safe cursor.
+    """
+    position = f"{sale.sale_date.isoformat()}|{sale.id}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+# Function to decode a cursor into the position of a sale
+def decode_sale_cursor(cursor: str):
+    """
+    Decode a cursor produced by `encode_sale_cursor`.
+
+    Args:
+        cursor (str): Opaque cursor.
+
+    Returns:
+        Tuple[datetime, int]: Sale date and id of the last sale of the previous page.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    try:
+        sale_date, sale_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(sale_date), int(sale_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Function to get a page of sales based on the filtering
+def get_all_sale(db: Session, start_date, end_date, product_id, category, cursor=None, limit=100):
+    """
+    Get a page of sales based on optional filters, newest first.
+
+    Pages are fetched with keyset pagination on (sale_date, id), so every page costs the
+    same regardless of how deep it is.
+
+    Args:
+        db (Session): Database session.
+        start_date (date): Start date for filtering sales (optional).
+        end_date (date): End date for filtering sales, inclusive (optional).
         product_id (int): ID of the product for filtering sales (optional).
-        category (str): Category for filtering sales (optional).
+        category (Category): Category for filtering sales (optional).
+        cursor (str): Cursor returned with the previous page (optional).
+        limit (int): Maximum number of sales on the page.
 
     Returns:
-        List[Sale]: List of sales based on the specified filters.
+        Dict: Sales on the page and the cursor of the next page.
+    """
+    # Create the base query on the sale columns (no ORM objects) and apply the specified filters
+    query = filter_sales(db.query(*SALE_COLUMNS), start_date, end_date, product_id, category)
+
+    # Continue after the last sale of the previous page, if specified
+    if cursor:
+        sale_date, sale_id = decode_sale_cursor(cursor)
+        query = query.filter(or_(Sale.sale_date < sale_date, and_(Sale.sale_date == sale_date, Sale.id < sale_id)))
+
+    # Fetch one extra row to know whether another page follows
+    sales_data = query.order_by(Sale.sale_date.desc(), Sale.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_sale_cursor(sales_data[limit - 1]) if len(sales_data) > limit else None
+
+    # Return the sales data as plain dicts
+    return {"items": [row._asdict() for row in sales_data[:limit]], "next_cursor": next_cursor}
+
+# Function to stream all sales matching the filters as NDJSON or CSV chunks
+def export_sales(db: Session, export_format: ExportFormat, start_date=None, end_date=None, product_id=None,
+                 category=None, batch_size: int = 1000):
+    """
+    Stream all sales matching the filters, oldest first, as encoded text chunks.
+
+    Rows are read as plain tuples in pages of `batch_size` with keyset pagination on
+    (sale_date, id), which needs no server-side cursor from the driver, and each page is
+    encoded into one chunk, so memory use does not grow with the size of the export.
+
+    Args:
+        db (Session): Database session.
+        export_format (ExportFormat): Format of the export.
+        start_date (date): Start date for filtering sales (optional).
+        end_date (date): End date for filtering sales, inclusive (optional).
+        product_id (int): ID of the product for filtering sales (optional).
+        category (Category): Category for filtering sales (optional).
+        batch_size (int): Number of rows fetched and encoded per chunk.
+
+    Yields:
+        str: Encoded chunk of sales.
+    """
+    query = filter_sales(db.query(*SALE_COLUMNS), start_date, end_date, product_id, category)
+    field_names = [column.key for column in SALE_COLUMNS]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == ExportFormat.CSV:
+        writer.writerow(field_names)
+
+    last = None
+    while True:
+        page = query
+        if last is not None:
+            # Continue after the last sale of the previous page
+            page = page.filter(or_(Sale.sale_date > last.sale_date,
+                                   and_(Sale.sale_date == last.sale_date, Sale.id > last.id)))
+        rows = page.order_by(Sale.sale_date, Sale.id).limit(batch_size).all()
+
+        for row in rows:
+            values = [
+                value.value if isinstance(value, Enum) else value.isoformat() if isinstance(value, datetime) else value
+                for value in row
+            ]
+            if export_format == ExportFormat.CSV:
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(field_names, values))))
+                buffer.write("\n")
+
+        if buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if len(rows) < batch_size:
+            break
+        last = rows[-1]
+
+# Function to apply the optional sales filters to a query
+def filter_sales(query, start_date=None, end_date=None, product_id=None, category=None):
     """
-    # Create the base query
-    query = db.query(Sale)
+    Apply the optional date range, product and category filters to a sales query.
 
-    # Apply date range filter, if specified
-    if start_date and end_date:
-        query = query.filter(func.DATE(Sale.sale_date) >= start_date, func.DATE(Sale.sale_date) <= end_date)
+    Dates are turned into a half-open range on the raw `sale_date` column and the product
+    is resolved to its inventory item, so both predicates can use the composite indexes
+    on `sales(sale_date, inventory_id)` and `sales(inventory_id, sale_date)`.
+
+    Args:
+        query (Query): Query selecting from the sales table.
+        start_date (date): Start date of the range (optional).
+        end_date (date): End date of the range, inclusive (optional).
+        product_id (int): ID of the product (optional).
+        category (Category): Category of the product (optional).
+
+    Returns:
+        Query: Filtered query.
+    """
+    if start_date:
+        query = query.filter(Sale.sale_date >= datetime.combine(start_date, time.min))
+
+    if end_date:
+        query = query.filter(Sale.sale_date < datetime.combine(end_date + timedelta(days=1), time.min))
 
-    # Apply product filter, if specified
     if product_id:
-        query = query.join(Inventory).join(Product).filter(Product.id == product_id)
+        inventory_id = select(Inventory.id).where(Inventory.product_id == product_id).scalar_subquery()
+        query = query.filter(Sale.inventory_id == inventory_id)
 
-    # Apply category filter, if specified
     if category:
-        query = query.join(Inventory).join(Product).filter(Product.category == category)
-
-    # Get all sales data based on the specified filters
-    sales_data = query.all()
+        query = query.filter(Sale.category == category)
 
-    # Return the sales data
-    return sales_data
+    return query
 
 # Function to get all daily sales data based on dates
-def analyze_daily_revenue(db: Session):
+def analyze_daily_revenue(db: Session, start_date=None, end_date=None, product_id=None, category=None):
     """
     Analyze daily revenue based on sales.
 
+    Unfiltered requests are answered from the daily revenue rollups; filtered requests
+    aggregate only the matching sales.
+
     Args:
         db (Session): Database session.
+        start_date (date): Start date of the date range (optional).
+        end_date (date): End date of the date range, inclusive (optional).
+        product_id (int): ID of the product (optional).
+        category (Category): Category of the product (optional).
 
     Returns:
         List[Dict]: List of dictionaries containing daily revenue data.
     """
     try:
-        daily_sales_data = (
-            db.query(
-                func.DATE(Sale.sale_date).label("date"),
-                func.sum(Product.price * Sale.quantity_sold).label("total_revenue")
-            )
-            .join(Inventory, Inventory.id == Sale.inventory_id)
-            .join(Product, Product.id == Inventory.product_id)
-            .group_by(func.DATE(Sale.sale_date))
-            .all()
-        )
-
         result = [
-            {"date": str(row.date), "total_revenue": row.total_revenue}
-            for row in daily_sales_data
+            {"date": str(row.period_start), "total_revenue": row.total_revenue}
+            for row in get_revenue_buckets(db, RevenuePeriod.DAILY, start_date, end_date, product_id, category)
         ]
 
         return result
@@ -107,37 +402,31 @@ def analyze_daily_revenue(db: Session):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Function to get all the weekly sales data based on date range (7 days)
-def analyze_weekly_revenue(db: Session):
+def analyze_weekly_revenue(db: Session, start_date=None, end_date=None, product_id=None, category=None):
     """
     Analyze weekly revenue based on sales.
 
+    Unfiltered requests are answered from the weekly revenue rollups; filtered requests
+    aggregate only the matching sales.
+
     Args:
         db (Session): Database session.
+        start_date (date): Start date of the date range (optional).
+        end_date (date): End date of the date range, inclusive (optional).
+        product_id (int): ID of the product (optional).
+        category (Category): Category of the product (optional).
 
     Returns:
         List[Dict]: List of dictionaries containing weekly revenue data.
     """
     try:
-        weekly_sales_data = (
-            db.query(
-                func.WEEK(Sale.sale_date).label("week"),
-                func.MIN(func.DATE(Sale.sale_date)).label("start_date"),
-                func.MAX(func.DATE(Sale.sale_date)).label("end_date"),
-                func.sum(Product.price * Sale.quantity_sold).label("total_revenue")
-            )
-            .join(Inventory, Inventory.id == Sale.inventory_id)
-            .join(Product, Product.id == Inventory.product_id)
-            .group_by(func.WEEK(Sale.sale_date))
-            .all()
-        )
-
         result = [
             {
-                "start_date": str(row.start_date),
-                "end_date": str(row.end_date),
+                "start_date": str(row.first_sale_date),
+                "end_date": str(row.last_sale_date),
                 "total_revenue": row.total_revenue
             }
-            for row in weekly_sales_data
+            for row in get_revenue_buckets(db, RevenuePeriod.WEEKLY, start_date, end_date, product_id, category)
         ]
 
         return result
@@ -146,38 +435,32 @@ def analyze_weekly_revenue(db: Session):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Function to get all monthly sales data based on a 1-month range
-def analyze_monthly_revenue(db: Session):
+def analyze_monthly_revenue(db: Session, start_date=None, end_date=None, product_id=None, category=None):
     """
     Analyze monthly revenue based on sales.
 
+    Unfiltered requests are answered from the monthly revenue rollups; filtered requests
+    aggregate only the matching sales.
+
     Args:
         db (Session): Database session.
+        start_date (date): Start date of the date range (optional).
+        end_date (date): End date of the date range, inclusive (optional).
+        product_id (int): ID of the product (optional).
+        category (Category): Category of the product (optional).
 
     Returns:
         List[Dict]: List of dictionaries containing monthly revenue data.
     """
     try:
-        monthly_sales_data = (
-            db.query(
-                func.MONTH(Sale.sale_date).label("month"),
-                func.MIN(func.DATE(Sale.sale_date)).label("start_date"),
-                func.MAX(func.DATE(Sale.sale_date)).label("end_date"),
-                func.sum(Product.price * Sale.quantity_sold).label("total_revenue")
-            )
-            .join(Inventory, Inventory.id == Sale.inventory_id)
-            .join(Product, Product.id == Inventory.product_id)
-            .group_by(func.MONTH(Sale.sale_date))
-            .all()
-        )
-
         result = [
             {
-                "month": row.month,
-                "start_date": str(row.start_date),
-                "end_date": str(row.end_date),
+                "month": row.period_start.month,
+                "start_date": str(row.first_sale_date),
+                "end_date": str(row.last_sale_date),
                 "total_revenue": row.total_revenue
             }
-            for row in monthly_sales_data
+            for row in get_revenue_buckets(db, RevenuePeriod.MONTHLY, start_date, end_date, product_id, category)
         ]
 
         return result
@@ -186,41 +469,260 @@ def analyze_monthly_revenue(db: Session):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Function to get all annual sales data
-def analyze_annual_revenue(db: Session):
+def analyze_annual_revenue(db: Session, start_date=None, end_date=None, product_id=None, category=None):
     """
     Analyze annual revenue based on sales.
 
+    Unfiltered requests are answered from the annual revenue rollups; filtered requests
+    aggregate only the matching sales.
+
     Args:
         db (Session): Database session.
+        start_date (date): Start date of the date range (optional).
+        end_date (date): End date of the date range, inclusive (optional).
+        product_id (int): ID of the product (optional).
+        category (Category): Category of the product (optional).
 
     Returns:
         List[Dict]: List of dictionaries containing annual revenue data.
     """
     try:
-        annual_sales_data = (
-            db.query(
-                func.YEAR(Sale.sale_date).label("year"),
-                func.MIN(func.DATE(Sale.sale_date)).label("start_date"),
-                func.MAX(func.DATE(Sale.sale_date)).label("end_date"),
-                func.sum(Product.price * Sale.quantity_sold).label("total_revenue")
-            )
-            .join(Inventory, Inventory.id == Sale.inventory_id)
-            .join(Product, Product.id == Inventory.product_id)
-            .group_by(func.YEAR(Sale.sale_date))
-            .all()
-        )
-
         result = [
             {
-                "year": row.year,
-                "start_date": str(row.start_date),
-                "end_date": str(row.end_date),
+                "year": row.period_start.year,
+                "start_date": str(row.first_sale_date),
+                "end_date": str(row.last_sale_date),
                 "total_revenue": row.total_revenue
             }
-            for row in annual_sales_data
+            for row in get_revenue_buckets(db, RevenuePeriod.ANNUAL, start_date, end_date, product_id, category)
         ]
 
         return result
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# ---------------------------- Revenue Rollup Functions ------------------------------
+
+# Function to compute the first day of the bucket a date falls into
+def get_period_start(period: RevenuePeriod, day: date):
+    """
+    Get the first day of the rollup bucket containing a date.
+
+    Args:
+        period (RevenuePeriod): Granularity of the bucket.
+        day (date): Date to place in a bucket.
+
+    Returns:
+        date: First day of the bucket.
+    """
+    if period == RevenuePeriod.DAILY:
+        return day
+    if period == RevenuePeriod.WEEKLY:
+        return day - timedelta(days=day.weekday())
+    if period == RevenuePeriod.MONTHLY:
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+# Function to add the revenue of a sale to every rollup bucket containing its date
+def add_sale_to_rollups(db: Session, sale_day: date, revenue: float):
+    """
+    Add revenue to the daily, weekly, monthly and annual buckets containing a date.
+
+    The buckets are updated with set-based increments so concurrent sales never lose
+    updates. Nothing is committed; the caller commits together with the sale.
+
+    Args:
+        db (Session): Database session.
+        sale_day (date): Date of the sale.
+        revenue (float): Revenue of the sale.
+    """
+    for period in RevenuePeriod:
+        period_start = get_period_start(period, sale_day)
+        increment = (
+            update(RevenueRollup)
+            .where(RevenueRollup.period == period, RevenueRollup.period_start == period_start)
+            .values(
+                total_revenue=RevenueRollup.total_revenue + revenue,
+                first_sale_date=case(
+                    (RevenueRollup.first_sale_date > sale_day, sale_day), else_=RevenueRollup.first_sale_date
+                ),
+                last_sale_date=case(
+                    (RevenueRollup.last_sale_date < sale_day, sale_day), else_=RevenueRollup.last_sale_date
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(increment).rowcount:
+            continue
+
+        # First sale of the bucket: create it, or fall back to the increment if a
+        # concurrent transaction created it first
+        try:
+            with db.begin_nested():
+                db.add(RevenueRollup(period=period, period_start=period_start, first_sale_date=sale_day,
+                                     last_sale_date=sale_day, total_revenue=revenue))
+        except IntegrityError:
+            db.execute(increment)
+
+# Function to retrieve the rollup buckets of a period
+def get_revenue_rollups(db: Session, period: RevenuePeriod):
+    """
+    Get all rollup buckets of a period, oldest first.
+
+    Args:
+        db (Session): Database session.
+        period (RevenuePeriod): Granularity of the buckets.
+
+    Returns:
+        List[Row]: Start, first and last sale dates and revenue of each bucket of the period.
+    """
+    return (
+        db.query(
+            RevenueRollup.period_start,
+            RevenueRollup.first_sale_date,
+            RevenueRollup.last_sale_date,
+            RevenueRollup.total_revenue,
+        )
+        .filter(RevenueRollup.period == period)
+        .order_by(RevenueRollup.period_start)
+        .all()
+    )
+
+# Function to build the query aggregating sales revenue per day
+def get_daily_revenue_query(db: Session):
+    """
+    Build a query returning the revenue of each day, aggregated over the sales table alone.
+
+    Args:
+        db (Session): Database session.
+
+    Returns:
+        Query: Query with `date` and `total_revenue` columns, grouped by day.
+    """
+    return (
+        db.query(
+            func.DATE(Sale.sale_date).label("date"),
+            func.sum(Sale.unit_price * Sale.quantity_sold).label("total_revenue")
+        )
+        .group_by(func.DATE(Sale.sale_date))
+    )
+
+# Function to fold daily revenue rows into period buckets
+def fold_daily_revenue(daily_sales_data, periods):
+    """
+    Fold daily revenue rows into buckets of the given periods.
+
+    Args:
+        daily_sales_data (Iterable[Row]): Rows with `date` and `total_revenue` columns.
+        periods (Iterable[RevenuePeriod]): Periods to build buckets for.
+
+    Returns:
+        Dict[Tuple[RevenuePeriod, date], Dict]: Bucket values keyed by period and bucket start.
+    """
+    periods = list(periods)
+    buckets = {}
+    for row in daily_sales_data:
+        # SQLite returns DATE() as a string, MySQL as a date
+        day = date.fromisoformat(row.date) if isinstance(row.date, str) else row.date
+        for period in periods:
+            key = (period, get_period_start(period, day))
+            bucket = buckets.setdefault(key, {"first_sale_date": day, "last_sale_date": day, "total_revenue": 0.0})
+            bucket["first_sale_date"] = min(bucket["first_sale_date"], day)
+            bucket["last_sale_date"] = max(bucket["last_sale_date"], day)
+            bucket["total_revenue"] += row.total_revenue or 0.0
+    return buckets
+
+# Function to retrieve the revenue buckets of a period, optionally filtered
+def get_revenue_buckets(db: Session, period: RevenuePeriod, start_date=None, end_date=None, product_id=None,
+                        category=None):
+    """
+    Get the revenue buckets of a period, oldest first.
+
+    Without filters the maintained rollups are returned. With filters, only the matching
+    sales are aggregated per day in the database and folded into buckets.
+
+    Args:
+        db (Session): Database session.
+        period (RevenuePeriod): Granularity of the buckets.
+        start_date (date): Start date of the date range (optional).
+        end_date (date): End date of the date range, inclusive (optional).
+        product_id (int): ID of the product (optional).
+        category (Category): Category of the product (optional).
+
+    Returns:
+        List[Row | RevenueRollup]: Revenue buckets of the period, with `period_start`,
+        `first_sale_date`, `last_sale_date` and `total_revenue` attributes.
+    """
+    if not (start_date or end_date or product_id or category):
+        return get_revenue_rollups(db, period)
+
+    daily_sales_data = filter_sales(get_daily_revenue_query(db), start_date, end_date, product_id, category)
+    buckets = fold_daily_revenue(daily_sales_data, [period])
+    return [
+        RevenueRollup(period=period, period_start=period_start, **bucket)
+        for (_, period_start), bucket in sorted(buckets.items(), key=lambda item: item[0][1])
+    ]
+
+# Function to rebuild all rollup buckets from the sales table
+def rebuild_revenue_rollups(db: Session):
+    """
+    Rebuild every revenue rollup bucket from the sales history.
+
+    Sales are aggregated per day over the sales table alone and folded into the coarser
+    periods in Python, so the rebuild reads one row per day of history. Run it for
+    backfills or after importing sales outside of `create_sale`.
+
+    Args:
+        db (Session): Database session.
+
+    Returns:
+        int: Number of rollup buckets written.
+    """
+    buckets = fold_daily_revenue(get_daily_revenue_query(db), RevenuePeriod)
+
+    db.query(RevenueRollup).delete(synchronize_session=False)
+    db.add_all(
+        RevenueRollup(period=period, period_start=period_start, **bucket)
+        for (period, period_start), bucket in buckets.items()
+    )
+    db.commit()
+    return len(buckets)
+
+# Function to copy product prices onto sales recorded without them
+def backfill_sale_prices(db: Session, batch_size: int = 10000):
+    """
+    Store the current product price and category on sales that have no unit price yet.
+
+    Sales recorded before the price was captured on the sale row are updated in id
+    ranges of `batch_size`, committing after each range to keep locks short.
+
+    Args:
+        db (Session): Database session.
+        batch_size (int): Number of sale ids covered by each update.
+
+    Returns:
+        int: Number of sales updated.
+    """
+    first_id, last_id = db.query(func.min(Sale.id), func.max(Sale.id)).filter(Sale.unit_price.is_(None)).one()
+    if first_id is None:
+        return 0
+
+    product = (
+        db.query(Product)
+        .join(Inventory, Inventory.product_id == Product.id)
+        .filter(Inventory.id == Sale.inventory_id)
+    )
+    updated = 0
+    for batch_start in range(first_id, last_id + 1, batch_size):
+        updated += db.execute(
+            update(Sale)
+            .where(Sale.id >= batch_start, Sale.id < batch_start + batch_size, Sale.unit_price.is_(None))
+            .values(
+                unit_price=product.with_entities(Product.price).scalar_subquery(),
+                category=product.with_entities(Product.category).scalar_subquery(),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+    return updated
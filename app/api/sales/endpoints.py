@@ -1,16 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from db.session import get_db
+from db.session import get_db, get_read_db
 from api.sales import crud as sales_crud
 from api.inventory import cruds as inventory_cruds
-from api.sales.schemas import SaleCreate, SaleResponse
+from api.sales.schemas import SaleCreate, SaleResponse, PaginatedSales, SaleBatchResponse
 from datetime import date
-from utils.enums import Category
+from utils.enums import Category, ExportFormat
 from typing import List
+from utils.responses import trusted_response
 
 router = APIRouter()
 
+# Maximum number of sales accepted by a single batch request
+MAX_SALES_BATCH_SIZE = 1000
+
 # ------------------------ Sales Routes -----------------------------------------------------------
 
 # Endpoint to create a sale
@@ -26,92 +31,183 @@ def create_sale(sale: SaleCreate, db: Session = Depends(get_db)):
     Returns:
         SaleResponse: Created sale record.
     """
-    # Fetch the corresponding inventory item
-    inventory = inventory_cruds.get_inventory_by_id(db, sale.inventory_id)
+    # Create the sale and update inventory (fails if the item lacks the stock for the sale)
+    return sales_crud.create_sale(db=db, sale=sale)
+
+# Endpoint to create a batch of sales
+@router.post("/sales/batch", response_model=SaleBatchResponse)
+def create_sales_batch(sales: List[SaleCreate], db: Session = Depends(get_db)):
+    """
+    Create a batch of sale records in a single transaction.
+
+    Args:
+        sales (List[SaleCreate]): Sale creation data, in the order the sales happened.
+        db (Session): Database session.
 
-    # Check if the inventory exists and has enough quantity for the sale
-    if not inventory or inventory.quantity < sale.quantity_sold:
-        raise HTTPException(status_code=400, detail="Invalid sale request")
+    Returns:
+        SaleBatchResponse: Outcome of each sale of the batch.
+    """
+    if len(sales) > MAX_SALES_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {MAX_SALES_BATCH_SIZE} sales")
 
-    # Create the sale and update inventory
-    return sales_crud.create_sale(db=db, inventory=inventory, sale=sale)
+    results = sales_crud.create_sales_batch(db, sales) if sales else []
+    accepted = sum(result.accepted for result in results)
+    return SaleBatchResponse(accepted=accepted, rejected=len(results) - accepted, results=results)
 
 # Endpoint to retrieve sales
-@router.get("/sales", response_model=List[SaleResponse])
+@router.get("/sales", response_model=PaginatedSales)
 def get_sales_data(
     start_date: date = Query(None, description="Start date of the date range (YYYY-MM-DD)"),
     end_date: date = Query(None, description="End date of the date range (YYYY-MM-DD)"),
     product_id: int = Query(None, description="Filter by product ID"),
     category: Category = Query(None, description="Filter by category"),
-    db: Session = Depends(get_db)
+    cursor: str = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of sales per page"),
+    db: Session = Depends(get_read_db)
 ):
     """
-    Get sales data based on date range, product, and category filters.
+    Get a page of sales data based on date range, product, and category filters.
 
     Args:
         start_date (date): Start date of the date range (optional).
         end_date (date): End date of the date range (optional).
         product (str): Optional filter by product ID.
         category (Category): Optional filter by category.
+        cursor (str): Cursor of the page to fetch (optional, first page if omitted).
+        limit (int): Maximum number of sales per page.
         db (Session): Database session.
 
     Returns:
-        List[SaleResponse]: List of sales records based on the specified filters.
+        PaginatedSales: Sales records on the page and the cursor of the next page.
+    """
+    return trusted_response(sales_crud.get_all_sale(db, start_date, end_date, product_id, category, cursor, limit))
+
+# Endpoint to export sales as a stream
+@router.get("/sales/export")
+def export_sales_data(
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format", description="Export format"),
+    start_date: date = Query(None, description="Start date of the date range (YYYY-MM-DD)"),
+    end_date: date = Query(None, description="End date of the date range (YYYY-MM-DD)"),
+    product_id: int = Query(None, description="Filter by product ID"),
+    category: Category = Query(None, description="Filter by category"),
+    db: Session = Depends(get_read_db)
+):
     """
-    return sales_crud.get_all_sale(db, start_date, end_date, product_id, category)
+    Export all sales matching the date range, product, and category filters.
+
+    The response is streamed one page of sales at a time, so memory use stays flat
+    regardless of the number of exported sales.
+
+    Args:
+        export_format (ExportFormat): Export format, NDJSON or CSV.
+        start_date (date): Start date of the date range (optional).
+        end_date (date): End date of the date range (optional).
+        product_id (int): Optional filter by product ID.
+        category (Category): Optional filter by category.
+        db (Session): Database session.
+
+    Returns:
+        StreamingResponse: Streamed NDJSON or CSV file of sales records.
+    """
+    media_type = "text/csv" if export_format == ExportFormat.CSV else "application/x-ndjson"
+    return StreamingResponse(
+        sales_crud.export_sales(db, export_format, start_date, end_date, product_id, category),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=sales.{export_format.value}"}
+    )
 
 # Endpoint to analyze revenue on a daily basis
 @router.get("/sales/revenue/daily/")
-def analyze_daily_revenue(db: Session = Depends(get_db)):
+def analyze_daily_revenue(
+    start_date: date = Query(None, description="Start date of the date range (YYYY-MM-DD)"),
+    end_date: date = Query(None, description="End date of the date range (YYYY-MM-DD)"),
+    product_id: int = Query(None, description="Filter by product ID"),
+    category: Category = Query(None, description="Filter by category"),
+    db: Session = Depends(get_read_db)
+):
     """
-    Analyze daily revenue.
+    Analyze daily revenue, optionally filtered by date range, product and category.
 
     Args:
+        start_date (date): Start date of the date range (optional).
+        end_date (date): End date of the date range (optional).
+        product_id (int): Optional filter by product ID.
+        category (Category): Optional filter by category.
         db (Session): Database session.
 
     Returns:
         List[Dict[str, Union[str, float]]]: List of daily revenue entries.
     """
-    return sales_crud.analyze_daily_revenue(db)
+    return trusted_response(sales_crud.analyze_daily_revenue(db, start_date, end_date, product_id, category))
 
 # Endpoint to analyze revenue on a weekly basis
 @router.get("/sales/revenue/weekly/")
-def analyze_weekly_revenue(db: Session = Depends(get_db)):
+def analyze_weekly_revenue(
+    start_date: date = Query(None, description="Start date of the date range (YYYY-MM-DD)"),
+    end_date: date = Query(None, description="End date of the date range (YYYY-MM-DD)"),
+    product_id: int = Query(None, description="Filter by product ID"),
+    category: Category = Query(None, description="Filter by category"),
+    db: Session = Depends(get_read_db)
+):
     """
-    Analyze weekly revenue.
+    Analyze weekly revenue, optionally filtered by date range, product and category.
 
     Args:
+        start_date (date): Start date of the date range (optional).
+        end_date (date): End date of the date range (optional).
+        product_id (int): Optional filter by product ID.
+        category (Category): Optional filter by category.
         db (Session): Database session.
 
     Returns:
         List[Dict[str, Union[str, float]]]: List of weekly revenue entries.
     """
-    return sales_crud.analyze_weekly_revenue(db)
+    return trusted_response(sales_crud.analyze_weekly_revenue(db, start_date, end_date, product_id, category))
 
 # Endpoint to analyze revenue on a monthly basis
 @router.get("/sales/revenue/monthly/")
-def analyze_monthly_revenue(db: Session = Depends(get_db)):
+def analyze_monthly_revenue(
+    start_date: date = Query(None, description="Start date of the date range (YYYY-MM-DD)"),
+    end_date: date = Query(None, description="End date of the date range (YYYY-MM-DD)"),
+    product_id: int = Query(None, description="Filter by product ID"),
+    category: Category = Query(None, description="Filter by category"),
+    db: Session = Depends(get_read_db)
+):
     """
-    Analyze monthly revenue.
+    Analyze monthly revenue, optionally filtered by date range, product and category.
 
     Args:
+        start_date (date): Start date of the date range (optional).
+        end_date (date): End date of the date range (optional).
+        product_id (int): Optional filter by product ID.
+        category (Category): Optional filter by category.
         db (Session): Database session.
 
     Returns:
         List[Dict[str, Union[str, float]]]: List of monthly revenue entries.
     """
-    return sales_crud.analyze_monthly_revenue(db)
+    return trusted_response(sales_crud.analyze_monthly_revenue(db, start_date, end_date, product_id, category))
 
 # Endpoint to analyze revenue on an annual basis
 @router.get("/sales/revenue/annual/")
-def analyze_annual_revenue(db: Session = Depends(get_db)):
+def analyze_annual_revenue(
+    start_date: date = Query(None, description="Start date of the date range (YYYY-MM-DD)"),
+    end_date: date = Query(None, description="End date of the date range (YYYY-MM-DD)"),
+    product_id: int = Query(None, description="Filter by product ID"),
+    category: Category = Query(None, description="Filter by category"),
+    db: Session = Depends(get_read_db)
+):
     """
-    Analyze annual revenue.
+    Analyze annual revenue, optionally filtered by date range, product and category.
 
     Args:
+        start_date (date): Start date of the date range (optional).
+        end_date (date): End date of the date range (optional).
+        product_id (int): Optional filter by product ID.
+        category (Category): Optional filter by category.
         db (Session): Database session.
 
     Returns:
         List[Dict[str, Union[str, float]]]: List of annual revenue entries.
     """
-    return sales_crud.analyze_annual_revenue(db)
+    return trusted_response(sales_crud.analyze_annual_revenue(db, start_date, end_date, product_id, category))
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.types import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
-from utils.enums import Category
+from utils.enums import Category, RevenuePeriod
 from db.base import Base
 from db.session import engine
 from datetime import datetime
@@ -16,18 +16,52 @@ class Sale(Base):
         id (int): Primary key.
         inventory_id (int): Foreign key referencing the associated inventory item.
         quantity_sold (int): Quantity of the product sold.
+        unit_price (float): Price of the product at the time of the sale.
+        category (Enum): Category of the product at the time of the sale.
         sale_date (DateTime): Timestamp of the sale.
 
     Relationships:
         - inventory: Many-to-One relationship with the associated inventory item.
     """
     __tablename__ = "sales"
+    __table_args__ = (
+        Index("ix_sales_sale_date_inventory_id", "sale_date", "inventory_id"),
+        Index("ix_sales_inventory_id_sale_date", "inventory_id", "sale_date"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     inventory_id = Column(Integer, ForeignKey("inventory.id"))
     quantity_sold = Column(Integer)
+    unit_price = Column(Float)
+    category = Column(SQLAlchemyEnum(Category))
     sale_date = Column(DateTime(timezone=True), server_default=func.now())
     inventory = relationship('Inventory', back_populates='sales')
 
+
+# Define the RevenueRollup model (pre-aggregated revenue per period bucket)
+class RevenueRollup(Base):
+    """
+    Represents the pre-aggregated revenue of one period bucket.
+
+    Rows are maintained incrementally by `create_sale` in the same transaction as the sale,
+    and can be rebuilt from the sales table with `rebuild_revenue_rollups.py`.
+
+    Attributes:
+        id (int): Primary key.
+        period (Enum): Granularity of the bucket (daily, weekly, monthly, annual).
+        period_start (Date): First day of the bucket.
+        first_sale_date (Date): Date of the earliest sale in the bucket.
+        last_sale_date (Date): Date of the latest sale in the bucket.
+        total_revenue (float): Sum of price * quantity sold for the sales in the bucket.
+    """
+    __tablename__ = "revenue_rollups"
+    __table_args__ = (UniqueConstraint("period", "period_start", name="uq_revenue_rollups_period_start"),)
+    id = Column(Integer, primary_key=True, index=True)
+    period = Column(SQLAlchemyEnum(RevenuePeriod), nullable=False)
+    period_start = Column(Date, nullable=False)
+    first_sale_date = Column(Date, nullable=False)
+    last_sale_date = Column(Date, nullable=False)
+    total_revenue = Column(Float, nullable=False, default=0)
+
 # Try to create tables using the defined models and bind them to the engine
 try:
     Base.metadata.create_all(bind=engine)
@@ -1,5 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import List, Optional
+from utils.enums import Category
 
 # SaleCreate schema for creating a new sale record
 class SaleCreate(BaseModel):
@@ -8,10 +10,10 @@ class SaleCreate(BaseModel):
 
     Attributes:
         inventory_id (int): ID of the associated inventory item.
-        quantity_sold (int): Quantity of the product sold in the sale record.
+        quantity_sold (int): Quantity of the product sold in the sale record (must be positive).
     """
     inventory_id: int
-    quantity_sold: int
+    quantity_sold: int = Field(gt=0)
 
 # SaleResponse schema for retrieving details of a sale record
 class SaleResponse(BaseModel):
@@ -22,9 +24,57 @@ class SaleResponse(BaseModel):
         id (int): Unique identifier for the sale record.
         inventory_id (int): ID of the associated inventory item.
         quantity_sold (int): Quantity of the product sold in the sale record.
+        unit_price (float, optional): Price of the product at the time of the sale.
+        category (Category, optional): Category of the product at the time of the sale.
         sale_date (datetime): Timestamp of the sale record.
     """
     id: int
     inventory_id: int
     quantity_sold: int
+    unit_price: Optional[float] = None
+    category: Optional[Category] = None
     sale_date: datetime
+
+# PaginatedSales schema for a page of sale records
+class PaginatedSales(BaseModel):
+    """
+    Schema for a page of sale records.
+
+    Attributes:
+        items (List[SaleResponse]): Sale records on the current page.
+        next_cursor (str, optional): Cursor of the next page, or None on the last page.
+    """
+    items: List[SaleResponse]
+    next_cursor: Optional[str] = None
+
+# SaleBatchItemResult schema for the outcome of one sale in a batch
+class SaleBatchItemResult(BaseModel):
+    """
+    Schema for the outcome of one sale of a batch.
+
+    Attributes:
+        index (int): Position of the sale in the submitted batch.
+        inventory_id (int): ID of the associated inventory item.
+        quantity_sold (int): Quantity of the product sold.
+        accepted (bool): Whether the sale was recorded.
+        detail (str, optional): Reason the sale was rejected.
+    """
+    index: int
+    inventory_id: int
+    quantity_sold: int
+    accepted: bool
+    detail: Optional[str] = None
+
+# SaleBatchResponse schema for the outcome of a batch of sales
+class SaleBatchResponse(BaseModel):
+    """
+    Schema for the outcome of a batch of sales.
+
+    Attributes:
+        accepted (int): Number of sales recorded.
+        rejected (int): Number of sales rejected.
+        results (List[SaleBatchItemResult]): Outcome of each sale, in submission order.
+    """
+    accepted: int
+    rejected: int
+    results: List[SaleBatchItemResult]
@@ -0,0 +1,165 @@
+import mimetypes
+import os
+import re
+import stat
+from email.utils import formatdate
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from api.product.images import IMAGE_UPLOAD_DIR
+from api.uploads.responses import FileRangeResponse
+from utils.compression import get_accepted_encodings, no_compression
+from utils.listing import etag_matches
+
+router = APIRouter()
+
+# Directory served at /uploads
+UPLOAD_ROOT = os.path.abspath(os.path.dirname(IMAGE_UPLOAD_DIR))
+
+# Files named after their content hash (optionally with a variant suffix) never change
+CONTENT_ADDRESSED_FILE = re.compile(r"^(?P<stem>[0-9a-f]{64}(?:_[a-z]+)?)\.[a-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# Precompressed variants looked up next to a file, by content coding, in order of preference
+PRECOMPRESSED_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+mimetypes.add_type("image/webp", ".webp")
+
+# ------------------------ Upload Routes ---------------------------------------------------------------
+
+# Function to parse the Range header of a request
+def parse_range(range_header: str, size: int):
+    """
+    Parse a single byte range request.
+
+    Args:
+        range_header (str): Value of the Range header.
+        size (int): Size of the file.
+
+    Returns:
+        Tuple[int, int]: First and last byte of the range (inclusive), or None when the
+        header is malformed or asks for several ranges, in which case the whole file is sent.
+
+    Raises:
+        ValueError: If the range cannot be satisfied.
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    if size == 0:
+        raise ValueError("Empty file")
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise ValueError("Empty suffix range")
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        if first.isdigit() or last.isdigit():
+            raise
+        return None
+    if start >= size or end < start:
+        raise ValueError("Range starts after the end of the file")
+    return start, min(end, size - 1)
+
+# Function to find the file answering a request for an upload
+def resolve_upload(file_path: str, accepted_encodings):
+    """
+    Locate an uploaded file and the precompressed variant to send, if any.
+
+    Args:
+        file_path (str): Path of the file below the upload directory.
+        accepted_encodings (Set[str]): Content codings accepted by the client (empty to
+            send the file as is).
+
+    Returns:
+        Tuple[str, os.stat_result, str]: Path and status of the file to send, and its
+        content coding (None for the file itself), or None if there is no such file.
+    """
+    path = os.path.realpath(os.path.join(UPLOAD_ROOT, file_path))
+    if not path.startswith(UPLOAD_ROOT + os.sep) or any(part.startswith(".") for part in file_path.split("/")):
+        return None
+    try:
+        file_stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not stat.S_ISREG(file_stat.st_mode):
+        return None
+    for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+        if encoding in accepted_encodings or "*" in accepted_encodings:
+            try:
+                return path + suffix, os.stat(path + suffix), encoding
+            except FileNotFoundError:
+                continue
+    return path, file_stat, None
+
+# Endpoint to serve an uploaded file
+@router.api_route("/uploads/{file_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+@no_compression
+async def get_upload(file_path: str, request: Request):
+    """
+    Serve an uploaded file (e.g. a product image) in every environment.
+
+    Content-addressed files are cached by clients for a year; other files are revalidated
+    with their ETag. Single byte ranges are supported, and a precompressed .br or .gz
+    variant stored next to the file is sent when the client accepts it.
+
+    Args:
+        file_path (str): Path of the file below the upload directory.
+        request (Request): Incoming request.
+
+    Returns:
+        FileRangeResponse: The file, a byte range of it, or 304 Not Modified.
+
+    Raises:
+        HTTPException: If the file does not exist.
+    """
+    range_header = request.headers.get("range")
+    # Ranges are served from the file itself, never from a compressed variant
+    accepted_encodings = set() if range_header else get_accepted_encodings(request.headers.get("accept-encoding"))
+    resolved = await run_in_threadpool(resolve_upload, file_path, accepted_encodings)
+    if resolved is None:
+        raise HTTPException(404, detail="File not found")
+    path, file_stat, encoding = resolved
+
+    content_addressed = CONTENT_ADDRESSED_FILE.match(os.path.basename(file_path))
+    if content_addressed:
+        tag = content_addressed.group("stem")
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        tag = f"{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}"
+        cache_control = REVALIDATE_CACHE_CONTROL
+    etag = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+    headers = {
+        "etag": etag,
+        "cache-control": cache_control,
+        "last-modified": formatdate(file_stat.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+        "vary": "Accept-Encoding",
+    }
+    if encoding:
+        headers["content-encoding"] = encoding
+    media_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = file_stat.st_size
+    send_body = request.method != "HEAD"
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+            return FileRangeResponse(path, start, end - start + 1, status_code=206, headers=headers,
+                                     media_type=media_type, send_body=send_body)
+
+    return FileRangeResponse(path, 0, size, headers=headers, media_type=media_type, send_body=send_body)
@@ -0,0 +1,53 @@
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Size of the chunks read from disk when the server cannot send files directly
+FILE_CHUNK_SIZE = 256 * 1024
+
+
+class FileRangeResponse(Response):
+    """
+    Response sending a file, or a byte range of it, with the headers computed by the caller.
+
+    When the server supports the ASGI zero-copy send extension, the file descriptor is
+    handed to the server (which uses sendfile); otherwise the bytes are read in chunks
+    from a worker thread. HEAD requests only send the headers.
+    """
+    def __init__(self, path, offset, count, status_code=200, headers=None, media_type=None, send_body=True):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.send_body = send_body
+        self.headers["content-length"] = str(count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.offset)
+            remaining = self.count
+            while remaining:
+                chunk = await file.read(min(FILE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining:
+                # The file shrank while it was sent: end the response
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,28 @@
+# compact_inventory_history.py
+
+from sqlalchemy.orm import sessionmaker
+from db.session import engine
+from api.product.models import Product
+from api.inventory.models import Inventory, InventoryHistory
+from api.sales.models import Sale
+from api.inventory.retention import compact_inventory_history, maintain_archive_partitions, prune_history_archive
+
+# Create a session
+Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+db = Session()
+
+# Downsample the old history and move the raw entries to the archive (resumes where the last run stopped)
+moved = compact_inventory_history(db)
+print(f"Moved {moved} inventory history entries to the archive")
+
+# Keep the archive partitioned by month and drop the expired months (MySQL only)
+dropped = maintain_archive_partitions(db)
+if dropped:
+    print(f"Dropped archive partitions {', '.join(dropped)}")
+
+# Delete the remaining expired archive entries
+pruned = prune_history_archive(db)
+print(f"Deleted {pruned} expired archived inventory history entries")
+
+# Close the session
+db.close()
@@ -0,0 +1,124 @@
+import threading
+import time
+from sqlalchemy import event, exc
+
+# Upper bounds (in seconds) of the checkout wait time histogram buckets
+WAIT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics:
+    """
+    Thread-safe counters describing the connection pool of one engine.
+
+    Checkout, checkin, connect and invalidate counts are collected through pool
+    events. Checkout wait times and timeouts are recorded by the pool class returned
+    by `instrument_pool_class`.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool = None
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.checkout_timeouts = 0
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_TIME_BUCKETS) + 1)
+
+    def attach(self, engine):
+        """
+        Listen to the pool events of an engine.
+
+        Args:
+            engine (Engine | AsyncEngine): Engine whose pool is measured.
+        """
+        pool = getattr(engine, "sync_engine", engine).pool
+        self.pool = pool
+        event.listen(pool, "checkout", lambda *args: self._increment("checkouts"))
+        event.listen(pool, "checkin", lambda *args: self._increment("checkins"))
+        event.listen(pool, "connect", lambda *args: self._increment("connects"))
+        event.listen(pool, "invalidate", lambda *args: self._increment("invalidations"))
+
+    def _increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def observe_wait(self, seconds, timed_out=False):
+        """
+        Record the time spent waiting for a connection.
+
+        Args:
+            seconds (float): Time spent in the pool checkout.
+            timed_out (bool): Whether the checkout gave up after the pool timeout.
+        """
+        bucket = next((index for index, bound in enumerate(WAIT_TIME_BUCKETS) if seconds <= bound),
+                      len(WAIT_TIME_BUCKETS))
+        with self._lock:
+            self.wait_count += 1
+            self.wait_sum += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.wait_buckets[bucket] += 1
+            if timed_out:
+                self.checkout_timeouts += 1
+
+    def snapshot(self):
+        """
+        Get the current values of the pool metrics.
+
+        Returns:
+            Dict: Pool state, event counters and the checkout wait time histogram.
+        """
+        pool = self.pool
+        with self._lock:
+            # Cumulative counts of checkouts that waited at most each bound
+            histogram = {}
+            cumulative = 0
+            for bound, count in zip(WAIT_TIME_BUCKETS + ("inf",), self.wait_buckets):
+                cumulative += count
+                histogram[f"le_{bound}"] = cumulative
+            return {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "pool_size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "checkout_timeouts": self.checkout_timeouts,
+                "wait_seconds": {
+                    "count": self.wait_count,
+                    "sum": self.wait_sum,
+                    "max": self.wait_max,
+                    "histogram": histogram,
+                },
+            }
+
+
+def instrument_pool_class(pool_class, metrics):
+    """
+    Create a subclass of a pool class that records checkout wait times.
+
+    The subclass is kept when the engine recreates its pool, so the metrics survive
+    `engine.dispose()`.
+
+    Args:
+        pool_class (type): Pool class to instrument (e.g. QueuePool).
+        metrics (PoolMetrics): Metrics receiving the wait times.
+
+    Returns:
+        type: Instrumented pool class.
+    """
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = pool_class.connect(self)
+        except exc.TimeoutError:
+            metrics.observe_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        metrics.observe_wait(time.perf_counter() - start)
+        return connection
+
+    return type(f"Instrumented{pool_class.__name__}", (pool_class,), {"connect": connect})
@@ -1,13 +1,62 @@
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from decouple import config
+from db.pool_metrics import PoolMetrics, instrument_pool_class
+
+# Async drivers used for each database backend when no ASYNC_DATABASE_URL is given
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite", "postgresql": "asyncpg"}
 
 # Load the database URL from the environment file
 DATABASE_URL = config("DATABASE_URL")
 
+# Load the connection pool settings (size them to the number of workers and threads per worker)
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=5, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=10, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30, cast=float)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+
+# Metrics of the connection pool of each engine, exposed by the monitoring routes
+pool_metrics = {}
+
+
+def get_engine_options(database_url, pool_class, metrics):
+    """
+    Build the engine options applying the configured connection pool settings.
+
+    Args:
+        database_url (str): URL of the database.
+        pool_class (type): Queue pool class matching the engine (sync or async).
+        metrics (PoolMetrics): Metrics receiving the checkout wait times.
+
+    Returns:
+        Dict: Keyword arguments for `create_engine` or `create_async_engine`.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite databases live in a single connection and cannot be pooled
+        return {}
+    return {
+        "poolclass": instrument_pool_class(pool_class, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
 try:
     # Attempt to create the database engine
-    engine = create_engine(DATABASE_URL)
+    pool_metrics["primary"] = PoolMetrics()
+    engine = create_engine(DATABASE_URL, **get_engine_options(DATABASE_URL, QueuePool, pool_metrics["primary"]))
+    pool_metrics["primary"].attach(engine)
     
     # Attempt to create a session
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -18,11 +67,213 @@ except Exception as e:
     # Set SessionLocal to None to indicate that the database connection is not available
     SessionLocal = None
 
+# Load the read replica settings (reads stay on the primary when no replica is configured)
+READ_DATABASE_URL = config("READ_DATABASE_URL", default="")
+READ_STICKINESS_SECONDS = config("READ_STICKINESS_SECONDS", default=5, cast=int)
+
+# Cookie sending the reads of a client to the primary for a while after it wrote
+READ_PRIMARY_COOKIE = "read_primary"
+
+ReadSessionLocal = SessionLocal
+if READ_DATABASE_URL:
+    try:
+        # Attempt to create the read replica engine
+        pool_metrics["replica"] = PoolMetrics()
+        read_engine = create_engine(
+            READ_DATABASE_URL, **get_engine_options(READ_DATABASE_URL, QueuePool, pool_metrics["replica"])
+        )
+        pool_metrics["replica"].attach(read_engine)
+        ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    except Exception as e:
+        print(f"Warning: Unable to connect to the read replica, reading from the primary. {e}")
+
 # Use SessionLocal as needed in your application
 
-def get_db():
+
+def mark_read_primary(request: Request):
+    """
+    Send the following reads of a client to the primary after a write request.
+
+    Replicas lag behind the primary, so a client that just wrote reads from the primary
+    for `READ_STICKINESS_SECONDS` to see its own writes. The request is only marked here:
+    ReadPrimaryMiddleware sets the cookie once the response status shows the write
+    succeeded.
+
+    Args:
+        request (Request): Current request.
+    """
+    if READ_DATABASE_URL and request.method not in ("GET", "HEAD", "OPTIONS"):
+        request.state.read_primary = True
+
+
+class ReadPrimaryMiddleware:
+    """
+    ASGI middleware setting the read stickiness cookie on the successful responses
+    (status below 400) of the requests marked by `mark_read_primary`.
+
+    Failed writes changed nothing the client could miss on a replica, so they leave its
+    reads where they are.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.cookie = f"{READ_PRIMARY_COOKIE}=1; HttpOnly; Max-Age={READ_STICKINESS_SECONDS}; Path=/; SameSite=lax"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Shared with the Request.state of the route's dependencies
+        state = scope.setdefault("state", {})
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start" and state.get("read_primary") and message["status"] < 400:
+                MutableHeaders(scope=message).append("set-cookie", self.cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def is_read_primary(request: Request):
+    """
+    Check whether the reads of a client must go to the primary.
+
+    Args:
+        request (Request): Current request.
+
+    Returns:
+        bool: True if the client wrote within the stickiness window.
+    """
+    return READ_PRIMARY_COOKIE in request.cookies
+
+
+def get_db(request: Request):
+    mark_read_primary(request)
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request):
+    """
+    Provide a session for read-only routes, on the read replica when one is configured.
+    """
+    db = SessionLocal() if is_read_primary(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_async_database_url(database_url):
+    """
+    Derive the URL of the async driver for the backend of a database URL.
+
+    Args:
+        database_url (str): Synchronous database URL (e.g. mysql+mysqlconnector://...).
+
+    Returns:
+        str: Same URL using the async driver of its backend (e.g. mysql+aiomysql://...).
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS.get(backend, url.get_driver_name())}").render_as_string(
+        hide_password=False
+    )
+
+# Load the async database settings (the async engine is used by the `async def` routes)
+ASYNC_DATABASE_ENABLED = config("ASYNC_DATABASE_ENABLED", default=True, cast=bool)
+ASYNC_DATABASE_URL = config("ASYNC_DATABASE_URL", default="")
+
+
+def create_async_session_factory(async_database_url, metrics_name):
+    """
+    Create an async engine and its session factory.
+
+    Args:
+        async_database_url (str): Database URL using an async driver.
+        metrics_name (str): Name of the engine in the pool metrics.
+
+    Returns:
+        async_sessionmaker: Factory of AsyncSession bound to the new engine.
+    """
+    pool_metrics[metrics_name] = PoolMetrics()
+    async_engine = create_async_engine(
+        async_database_url,
+        **get_engine_options(async_database_url, AsyncAdaptedQueuePool, pool_metrics[metrics_name])
+    )
+    pool_metrics[metrics_name].attach(async_engine)
+
+    # Objects stay loaded after commit so routes can serialize them without further IO
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if ASYNC_DATABASE_ENABLED:
+    try:
+        # Attempt to create the async engines (fails if the async driver is not installed)
+        AsyncSessionLocal = create_async_session_factory(
+            ASYNC_DATABASE_URL or get_async_database_url(DATABASE_URL), "primary_async"
+        )
+        AsyncReadSessionLocal = AsyncSessionLocal
+        if READ_DATABASE_URL and ReadSessionLocal is not SessionLocal:
+            AsyncReadSessionLocal = create_async_session_factory(
+                get_async_database_url(READ_DATABASE_URL), "replica_async"
+            )
+    except Exception as e:
+        print(f"Warning: Unable to create the async database engine, falling back to threaded sessions. {e}")
+        AsyncSessionLocal = AsyncReadSessionLocal = None
+
+
+class ThreadedSession:
+    """
+    Synchronous session exposing the subset of the AsyncSession API used by the routes.
+
+    It is the fallback when no async driver is available: every call runs in the
+    threadpool, so the event loop is never blocked by database IO.
+    """
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+async def get_async_db(request: Request):
+    """
+    Provide a session for `async def` routes.
+
+    Yields an AsyncSession when the async engine is available, otherwise a
+    ThreadedSession wrapping a synchronous session. Both run the synchronous CRUD
+    functions with `await db.run_sync(crud_function, *args)`.
+    """
+    mark_read_primary(request)
+    db = AsyncSessionLocal() if AsyncSessionLocal else ThreadedSession(SessionLocal(expire_on_commit=False))
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_async_read_db(request: Request):
+    """
+    Provide a session for read-only `async def` routes, on the read replica when one is configured.
+    """
+    if is_read_primary(request):
+        db = AsyncSessionLocal() if AsyncSessionLocal else ThreadedSession(SessionLocal(expire_on_commit=False))
+    else:
+        db = AsyncReadSessionLocal() if AsyncReadSessionLocal else ThreadedSession(ReadSessionLocal(expire_on_commit=False))
+    try:
+        yield db
+    finally:
+        await db.close()
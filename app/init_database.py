@@ -4,8 +4,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from db.base import Base
 from api.product.models import Product
+from api.product.cruds import bump_catalog_version
 from api.inventory.models import Inventory, InventoryHistory
 from api.sales.models import Sale
+from api.sales.crud import rebuild_revenue_rollups
 from decouple import config
 import random
 from utils.enums import Category, InventoryStatus  # Import the enums
@@ -26,6 +28,9 @@ db = Session()
 def generate_random_status():
     return random.choice(list(InventoryStatus))
 
+# Tell the catalog caches of running workers that the products changed
+catalog_version = bump_catalog_version(db)
+
 # Populate the product table
 for i in range(1, 31):
     db_product = Product(
@@ -34,6 +39,7 @@ for i in range(1, 31):
         price=random.uniform(10.0, 100.0),
         category=random.choice(list(Category)),  # Use the Category enum
         image=f"image_{i}.jpg",
+        catalog_version=catalog_version,
     )
     db.add(db_product)
 
@@ -91,11 +97,16 @@ for i in range(1, 31):
         db_sale = Sale(
             inventory_id=inventory_record.id,
             quantity_sold=quantity_sold,
+            unit_price=inventory_record.product.price,
+            category=inventory_record.product.category,
         )
         db.add(db_sale)
 
 # Commit the changes to the database
 db.commit()
 
+# Build the revenue rollups for the generated sales
+rebuild_revenue_rollups(db)
+
 # Close the session
 db.close()
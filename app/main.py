@@ -1,33 +1,47 @@
-import os
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from api.product import endpoints as product_endpoints
 from api.inventory import endpoints as inventory_enpoints
 from api.sales import endpoints as sales_enpoints
-from db.session import SessionLocal
+from api.monitoring import endpoints as monitoring_endpoints
+from api.uploads import endpoints as upload_endpoints
+from api.inventory.history_writer import start_history_writer, stop_history_writer
+from api.product.images import shutdown_image_workers
+from db.session import READ_DATABASE_URL, ReadPrimaryMiddleware
+from utils.compression import COMPRESSION_ENABLED, CompressionMiddleware
+from utils.responses import FAST_JSON_ENABLED, FastJSONResponse
 
-app = FastAPI()
 
-# Get the value of the environment variable (default to "development" if not set)
-environment = os.getenv("ENVIRONMENT", "development")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the background workers, and drain them on shutdown
+    start_history_writer()
+    yield
+    await run_in_threadpool(stop_history_writer)
+    await run_in_threadpool(shutdown_image_workers)
 
-# Conditionally serve static files only in non-production environments
-if environment != "production":
-    # Directory containing your static files (assuming uploads directory is in the same directory as main.py)
-    static_dir = os.path.join(os.path.dirname(__file__), "uploads")
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if FAST_JSON_ENABLED else JSONResponse,
+)
 
-    # Check if the directory exists before mounting
-    if os.path.exists(static_dir):
-        # Mount the static files directory
-        app.mount("/uploads", StaticFiles(directory=static_dir), name="uploads")
-    else:
-        print(f"Warning: The directory '{static_dir}' does not exist. Static files will not be served.")
+# Compress responses for clients accepting gzip, brotli or zstd
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Send the reads of a client to the primary for a while after a successful write
+if READ_DATABASE_URL:
+    app.add_middleware(ReadPrimaryMiddleware)
 
 # Routes
 app.include_router(product_endpoints.router, tags=["Products"])
 app.include_router(inventory_enpoints.router, tags=["Inventory"])
 app.include_router(sales_enpoints.router, tags=["Sales"])
+app.include_router(monitoring_endpoints.router, tags=["Monitoring"])
+app.include_router(upload_endpoints.router, tags=["Uploads"])
 
 if __name__ == '__main__':
     uvicorn.run(app)
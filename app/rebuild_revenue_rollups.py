@@ -0,0 +1,19 @@
+# rebuild_revenue_rollups.py
+
+from sqlalchemy.orm import sessionmaker
+from db.session import engine
+from api.product.models import Product
+from api.inventory.models import Inventory
+from api.sales.models import Sale
+from api.sales.crud import rebuild_revenue_rollups
+
+# Create a session
+Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+db = Session()
+
+# Rebuild the daily, weekly, monthly and annual revenue buckets from the sales table
+buckets = rebuild_revenue_rollups(db)
+print(f"Rebuilt {buckets} revenue rollup buckets")
+
+# Close the session
+db.close()
@@ -0,0 +1,19 @@
+# snapshot_inventory.py
+
+from sqlalchemy.orm import sessionmaker
+from db.session import engine
+from api.product.models import Product
+from api.inventory.models import Inventory, InventorySnapshot
+from api.sales.models import Sale
+from api.inventory.cruds import create_inventory_snapshot
+
+# Create a session
+Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+db = Session()
+
+# Take a checkpoint of every inventory item (schedule it, e.g. daily, to bound point-in-time queries)
+snapshot = create_inventory_snapshot(db)
+print(f"Took checkpoint {snapshot['id']} of {snapshot['item_count']} inventory items at {snapshot['taken_at']}")
+
+# Close the session
+db.close()
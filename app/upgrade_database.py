@@ -0,0 +1,47 @@
+# upgrade_database.py
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
+from db.base import Base
+from db.session import engine
+from api.product.models import Product
+from api.inventory.models import Inventory, InventoryHistory
+from api.sales.models import Sale
+from api.sales.crud import backfill_sale_prices
+from api.inventory.cruds import refresh_stock_statuses
+
+# Create the tables that do not exist yet
+Base.metadata.create_all(bind=engine)
+
+# Add the columns and indexes that were introduced after a table was created
+inspector = inspect(engine)
+with engine.begin() as connection:
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+                print(f"Added column {table.name}.{column.name}")
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+                print(f"Created index {index.name}")
+
+# Create a session
+Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+db = Session()
+
+# Store the product price and category on sales recorded before they were captured
+updated = backfill_sale_prices(db)
+print(f"Backfilled the unit price of {updated} sales")
+
+# Derive the status of every inventory item from its stock and reorder threshold
+updated = refresh_stock_statuses(db)
+print(f"Refreshed the stock status of {updated} inventory items")
+
+# Close the session
+db.close()
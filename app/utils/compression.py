@@ -0,0 +1,326 @@
+import threading
+import time
+import zlib
+import anyio
+from collections import Counter
+from decouple import config
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# -------------------------- Response Compression --------------------------------
+
+# Compress responses for clients accepting it
+COMPRESSION_ENABLED = config("COMPRESSION_ENABLED", default=True, cast=bool)
+# Responses sent in one piece below this size (in bytes) are not compressed
+COMPRESSION_MIN_SIZE = config("COMPRESSION_MIN_SIZE", default=1024, cast=int)
+# Content codings offered, in order of preference (those whose package is missing are skipped)
+COMPRESSION_ENCODINGS = config("COMPRESSION_ENCODINGS", default="br,zstd,gzip")
+# Compression level of each coding
+COMPRESSION_GZIP_LEVEL = config("COMPRESSION_GZIP_LEVEL", default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config("COMPRESSION_BROTLI_QUALITY", default=5, cast=int)
+COMPRESSION_ZSTD_LEVEL = config("COMPRESSION_ZSTD_LEVEL", default=3, cast=int)
+
+# Streamed responses are compressed and flushed chunk by chunk, so the client gets each
+# chunk right away; they use a faster level, capped per coding
+STREAMING_MAX_LEVELS = {"br": 4, "zstd": 3, "gzip": 4}
+# Bodies sent in one piece from this size (in bytes) are compressed in a worker thread
+COMPRESSION_THREAD_MIN_SIZE = 256 * 1024
+
+# Media types worth compressing (prefixes); images and archives already are compressed
+COMPRESSIBLE_MEDIA_TYPES = (
+    "text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml",
+    "image/svg+xml",
+)
+# Statuses whose response is sent as is
+UNCOMPRESSED_STATUSES = (204, 206, 304)
+
+
+# Function to list the content codings accepted by a client
+def get_accepted_encodings(accept_encoding: str):
+    """
+    Get the content codings accepted by the Accept-Encoding header of a request.
+
+    Args:
+        accept_encoding (str): Value of the header, or None.
+
+    Returns:
+        Set[str]: Accepted codings, excluding those with q=0 ("*" accepts any coding).
+    """
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        coding, _, parameters = item.strip().partition(";")
+        quality = parameters.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+# Function to list the content codings this server can produce
+def get_available_encodings(preferred: str = COMPRESSION_ENCODINGS):
+    """
+    Get the configured content codings whose compressor is installed.
+
+    Args:
+        preferred (str): Comma-separated codings, in order of preference.
+
+    Returns:
+        List[str]: Available codings, in order of preference.
+    """
+    installed = {"br": brotli is not None, "zstd": zstandard is not None, "gzip": True}
+    names = (name.strip().lower() for name in preferred.split(","))
+    return [name for name in dict.fromkeys(names) if installed.get(name)]
+
+# Function to exclude a route from response compression
+def no_compression(endpoint):
+    """
+    Mark a route endpoint whose responses must be sent uncompressed.
+
+    Apply it below the route decorator.
+
+    Args:
+        endpoint (Callable): Route endpoint.
+
+    Returns:
+        Callable: The same endpoint.
+    """
+    endpoint.compression_exempt = True
+    return endpoint
+
+
+class StreamCompressor:
+    """
+    Incremental compressor for one response body.
+
+    Each call returns the compressed bytes of its chunk, flushed so the client can decode
+    everything sent so far; the final call ends the stream. The CPU time spent is added
+    up in `cpu_time`.
+    """
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        self.cpu_time = 0.0
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=level)
+            self._compress, self._flush, self._finish = compressor.process, compressor.flush, compressor.finish
+        elif encoding == "zstd":
+            compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self._finish = compressor.flush
+        else:
+            # 16 + MAX_WBITS writes a gzip header and trailer around the deflate stream
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def compress(self, data, final=False):
+        started = time.thread_time()
+        compressed = self._compress(data) + (self._finish() if final else self._flush())
+        self.cpu_time += time.thread_time() - started
+        return compressed
+
+
+class CompressionMetrics:
+    """
+    Per-route counters of the responses seen by the compression middleware.
+
+    Routes are keyed by their path template, so the number of keys stays bounded.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def _route(self, route):
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = {
+                "responses": 0, "compressed": 0, "bytes_in": 0, "bytes_out": 0, "cpu_time": 0.0,
+                "encodings": Counter(),
+            }
+        return stats
+
+    def record_skipped(self, route):
+        """
+        Count a response sent uncompressed (too small, exempt or not compressible).
+        """
+        with self._lock:
+            self._route(route)["responses"] += 1
+
+    def record_compressed(self, route, encoding, bytes_in, bytes_out, cpu_time):
+        """
+        Count a compressed response with its size before and after compression.
+        """
+        with self._lock:
+            stats = self._route(route)
+            stats["responses"] += 1
+            stats["compressed"] += 1
+            stats["bytes_in"] += bytes_in
+            stats["bytes_out"] += bytes_out
+            stats["cpu_time"] += cpu_time
+            stats["encodings"][encoding] += 1
+
+    def snapshot(self):
+        """
+        Get the current values of the compression counters.
+
+        Returns:
+            Dict[str, Dict]: Responses seen and compressed, bytes before and after
+            compression, bytes saved, CPU time spent (ms) and codings used, per route.
+        """
+        with self._lock:
+            return {
+                route: {
+                    "responses": stats["responses"],
+                    "compressed": stats["compressed"],
+                    "bytes_in": stats["bytes_in"],
+                    "bytes_out": stats["bytes_out"],
+                    "bytes_saved": stats["bytes_in"] - stats["bytes_out"],
+                    "cpu_time_ms": round(stats["cpu_time"] * 1000, 3),
+                    "encodings": dict(stats["encodings"]),
+                }
+                for route, stats in self._routes.items()
+            }
+
+
+compression_metrics = CompressionMetrics()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli, zstd or gzip.
+
+    The coding is the first of `encodings` accepted by the client. Responses sent in one
+    piece are compressed whole when they reach `minimum_size`; streamed responses are
+    compressed chunk by chunk at a faster level and flushed after each chunk, so they are
+    never buffered. Responses already encoded, of a media type that does not compress,
+    with a status in UNCOMPRESSED_STATUSES, or from a route marked with `no_compression`
+    are sent as is.
+    """
+    def __init__(self, app: ASGIApp, minimum_size=COMPRESSION_MIN_SIZE, encodings=None, levels=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = encodings if encodings is not None else get_available_encodings()
+        self.levels = levels or {
+            "br": COMPRESSION_BROTLI_QUALITY, "zstd": COMPRESSION_ZSTD_LEVEL, "gzip": COMPRESSION_GZIP_LEVEL,
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accepted = get_accepted_encodings(Headers(scope=scope).get("accept-encoding"))
+        encoding = next((name for name in self.encodings if name in accepted or "*" in accepted), None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, scope, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    # Wraps the `send` of one request, deciding on the first body chunk whether to compress
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, encoding, send: Send):
+        self.middleware = middleware
+        self.scope = scope
+        self.encoding = encoding
+        self._send = send
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def route(self):
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "<unmatched>"
+
+    def is_compressible(self, headers: Headers):
+        if getattr(self.scope.get("endpoint"), "compression_exempt", False):
+            return False
+        if self.start["status"] < 200 or self.start["status"] in UNCOMPRESSED_STATUSES:
+            return False
+        if "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "").lower()
+        return media_type.startswith(COMPRESSIBLE_MEDIA_TYPES)
+
+    async def send(self, message: Message):
+        if self.passthrough:
+            await self._send(message)
+            return
+        if message["type"] == "http.response.start":
+            # Held until the first body chunk decides on the headers
+            self.start = message
+            return
+        if self.compressor is None:
+            await self._begin(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        compressed = self.compressor.compress(body, final=not more_body)
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        if compressed or not more_body:
+            await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+        if not more_body:
+            self._record()
+
+    async def _begin(self, message: Message):
+        headers = MutableHeaders(raw=self.start["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if (
+            message["type"] != "http.response.body"
+            or not self.is_compressible(headers)
+            or (not more_body and len(body) < self.middleware.minimum_size)
+        ):
+            self.passthrough = True
+            compression_metrics.record_skipped(self.route)
+            await self._send(self.start)
+            await self._send(message)
+            return
+
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        level = self.middleware.levels[self.encoding]
+        if more_body:
+            level = min(level, STREAMING_MAX_LEVELS[self.encoding])
+            if "content-length" in headers:
+                del headers["content-length"]
+            self.compressor = StreamCompressor(self.encoding, level)
+            await self._send(self.start)
+            await self.send(message)
+            return
+
+        self.compressor = StreamCompressor(self.encoding, level)
+        if len(body) >= COMPRESSION_THREAD_MIN_SIZE:
+            compressed = await anyio.to_thread.run_sync(self.compressor.compress, body, True)
+        else:
+            compressed = self.compressor.compress(body, final=True)
+        self.bytes_in, self.bytes_out = len(body), len(compressed)
+        headers["content-length"] = str(len(compressed))
+        await self._send(self.start)
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": False})
+        self._record()
+
+    def _record(self):
+        compression_metrics.record_compressed(
+            self.route, self.encoding, self.bytes_in, self.bytes_out, self.compressor.cpu_time
+        )
@@ -36,3 +36,33 @@ class InventoryStatus(Enum):
     RESERVED = "Reserved"
     DISCONTINUED = "Discontinued"
     LOW = "Low"
+
+
+# Define an enumeration for revenue rollup periods
+class RevenuePeriod(Enum):
+    """
+    Enumeration representing the granularity of a revenue rollup bucket.
+
+    Periods:
+        - DAILY: One bucket per calendar day.
+        - WEEKLY: One bucket per week (weeks start on Monday).
+        - MONTHLY: One bucket per calendar month.
+        - ANNUAL: One bucket per calendar year.
+    """
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    ANNUAL = "annual"
+
+
+# Define an enumeration for export file formats
+class ExportFormat(Enum):
+    """
+    Enumeration representing the formats data can be exported and imported in.
+
+    Formats:
+        - NDJSON: One JSON object per line.
+        - CSV: Comma-separated values with a header row.
+    """
+    NDJSON = "ndjson"
+    CSV = "csv"
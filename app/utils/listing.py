@@ -0,0 +1,60 @@
+import hashlib
+from fastapi import HTTPException
+
+# -------------------------- Listing Helpers --------------------------------
+
+# Function to parse the `fields` parameter of a listing route
+def parse_fields(fields: str, allowed):
+    """
+    Parse a comma-separated list of field names.
+
+    Args:
+        fields (str): Requested fields (e.g. "id,name,price"), or None for every field.
+        allowed (Tuple[str]): Names of the selectable fields.
+
+    Returns:
+        List[str]: Requested field names in request order, or every allowed field.
+
+    Raises:
+        HTTPException: If a requested field cannot be selected.
+    """
+    if not fields:
+        return list(allowed)
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}, expected some of {list(allowed)}")
+    return names
+
+# Function to build an entity tag from the values describing a result set
+def make_etag(*parts):
+    """
+    Build a weak entity tag from values that change whenever the result set changes.
+
+    Args:
+        *parts: Values such as the row count and the latest update time.
+
+    Returns:
+        str: Weak entity tag (e.g. 'W/"3f2a..."').
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+# Function to check a conditional request against the current entity tag
+def etag_matches(if_none_match: str, etag: str):
+    """
+    Check whether the If-None-Match header of a request matches an entity tag.
+
+    Tags are compared weakly, ignoring the W/ prefix.
+
+    Args:
+        if_none_match (str): Value of the If-None-Match header, or None.
+        etag (str): Current entity tag.
+
+    Returns:
+        bool: True if the client already has the current representation.
+    """
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
@@ -0,0 +1,65 @@
+from decimal import Decimal
+from decouple import config
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# -------------------------- Fast JSON Responses --------------------------------
+
+# Serialize responses with orjson and send trusted listing payloads without revalidating them
+# (ignored when orjson is not installed)
+FAST_JSON_ENABLED = config("FAST_JSON_ENABLED", default=False, cast=bool) and orjson is not None
+
+# Headers of the route's response that are not copied to a fast response
+_COMPUTED_HEADERS = (b"content-length", b"content-type")
+
+
+# Function to serialize the values orjson does not support natively
+def _encode_default(value):
+    # Aggregates such as SUM are returned as Decimal by MySQL
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson.
+
+    Datetimes, dates, enums and dataclasses are encoded natively, which is several
+    times faster than the standard library encoder used by JSONResponse.
+    """
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+# Function to send a payload built by the server without revalidating it
+def trusted_response(payload, response: Response = None):
+    """
+    Send a payload built by the server from database rows.
+
+    When fast JSON is enabled, the payload is encoded with orjson as is, skipping the
+    validation and `jsonable_encoder` pass FastAPI runs for the route's response model.
+    The payload must therefore already match that model. Otherwise it is returned
+    unchanged and goes through FastAPI's regular serialization.
+
+    Args:
+        payload (Any): Plain dicts, lists and scalars matching the route's response model.
+        response (Response): Response injected into the route, whose headers (e.g. ETag)
+            are copied to the fast response (optional).
+
+    Returns:
+        FastJSONResponse | Any: Encoded response, or the payload itself.
+    """
+    if not FAST_JSON_ENABLED:
+        return payload
+    fast_response = FastJSONResponse(payload)
+    if response is not None:
+        fast_response.raw_headers.extend(
+            (name, value) for name, value in response.raw_headers if name not in _COMPUTED_HEADERS
+        )
+    return fast_response
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Run the application against a throwaway SQLite database; the settings are read when
+# the application modules are first imported
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.sqlite")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from fastapi.testclient import TestClient
+from main import app
+from db.session import SessionLocal
+from api.inventory.models import Inventory
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+# Function to create a product with its inventory item through the API
+@pytest.fixture
+def create_product(client, db):
+    def create(quantity, shard_count=0, **fields):
+        product = {"name": "Test product", "description": "For tests", "price": 10.0,
+                   "category": "Laptops", "quantity": quantity, **fields}
+        response = client.post("/create_product", json=product)
+        assert response.status_code == 200, response.text
+        inventory_id = db.query(Inventory.id).filter(Inventory.product_id == response.json()["id"]).scalar()
+        if shard_count:
+            response = client.post(f"/inventory/{inventory_id}/shards", json={"shard_count": shard_count})
+            assert response.status_code == 200, response.text
+        return inventory_id
+    return create
@@ -0,0 +1,19 @@
+from api.product.search import ProductSearchIndex
+from db.session import SessionLocal
+
+
+def test_refresh_keeps_a_product_created_again_under_a_deleted_id(client):
+    index = ProductSearchIndex(check_interval=0, load_batch_size=1000)
+    index.ensure_fresh(SessionLocal())
+
+    # SQLite hands the highest ID out again once it is deleted
+    product = {"name": "Reused", "description": "Catalog entry", "price": 1.0, "category": "Laptops", "quantity": 1}
+    for name in ("Zeppelin", "Dirigible"):
+        product_id = client.post("/create_product", json={**product, "name": name}).json()["id"]
+        assert client.delete(f"/delete/{product_id}").status_code == 200
+    product_id = client.post("/create_product", json={**product, "name": "Airship"}).json()["id"]
+
+    index.ensure_fresh(SessionLocal())
+    assert index.search("airship")[0] == [product_id]
+    assert index.search("zeppelin")[1] == 0
+    assert index.search("dirigible")[1] == 0
@@ -0,0 +1,50 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statements and commits allowed per request on the single-transaction write paths
+CREATE_PRODUCT_BUDGET = {"statements": 5, "commits": 1}
+UPDATE_INVENTORY_BUDGET = {"statements": 4, "commits": 1}
+
+
+# Function to count the statements and commits sent by every engine, sync and async
+@contextmanager
+def count_queries():
+    counts = {"statements": 0, "commits": 0}
+
+    def count_statement(connection, cursor, statement, parameters, context, executemany):
+        counts["statements"] += 1
+
+    def count_commit(connection):
+        counts["commits"] += 1
+
+    event.listen(Engine, "before_cursor_execute", count_statement)
+    event.listen(Engine, "commit", count_commit)
+    try:
+        yield counts
+    finally:
+        event.remove(Engine, "before_cursor_execute", count_statement)
+        event.remove(Engine, "commit", count_commit)
+
+
+def test_create_product_query_budget(client, create_product):
+    # The first product write also creates the catalog version stamp
+    create_product(quantity=1)
+    product = {"name": "Budget", "description": "Counted", "price": 5.0, "category": "Laptops", "quantity": 3}
+    with count_queries() as counts:
+        response = client.post("/create_product", json=product)
+
+    assert response.status_code == 200, response.text
+    assert counts["commits"] == CREATE_PRODUCT_BUDGET["commits"]
+    assert counts["statements"] <= CREATE_PRODUCT_BUDGET["statements"], counts
+
+
+def test_update_inventory_query_budget(client, create_product):
+    inventory_id = create_product(quantity=5)
+    with count_queries() as counts:
+        response = client.patch(f"/inventory/{inventory_id}", json={"quantity": 9, "status": "Available"})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["quantity"] == 9
+    assert counts["commits"] == UPDATE_INVENTORY_BUDGET["commits"]
+    assert counts["statements"] <= UPDATE_INVENTORY_BUDGET["statements"], counts
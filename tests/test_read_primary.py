@@ -0,0 +1,36 @@
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from db import session
+from db.session import READ_PRIMARY_COOKIE, ReadPrimaryMiddleware, mark_read_primary
+
+
+@pytest.fixture
+def write_client(monkeypatch):
+    monkeypatch.setattr(session, "READ_DATABASE_URL", "sqlite://")
+    app = FastAPI()
+    app.add_middleware(ReadPrimaryMiddleware)
+
+    @app.post("/write/{status_code}", dependencies=[Depends(mark_read_primary)])
+    def write(status_code: int):
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail="Write failed")
+        return {"ok": True}
+
+    @app.get("/read", dependencies=[Depends(mark_read_primary)])
+    def read():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("status_code, sticky", [(200, True), (400, False), (404, False), (500, False)])
+def test_only_successful_writes_set_the_read_primary_cookie(write_client, status_code, sticky):
+    response = write_client.post(f"/write/{status_code}")
+
+    assert response.status_code == status_code
+    assert (READ_PRIMARY_COOKIE in response.cookies) is sticky
+
+
+def test_reads_do_not_set_the_read_primary_cookie(write_client):
+    assert READ_PRIMARY_COOKIE not in write_client.get("/read").cookies
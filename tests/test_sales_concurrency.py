@@ -0,0 +1,96 @@
+# These tests run on SQLite, which serializes writers and ignores `with_for_update`: they
+# cover the single-writer path only, i.e. that the conditional decrements never oversell
+# and never lose a sale. Row locking and the contention of concurrent writers on MySQL are
+# measured by `app/benchmark_sales.py` against a scratch MySQL database.
+
+import threading
+import time
+import pytest
+from fastapi import HTTPException
+from api.inventory.cruds import get_inventory_quantity
+from api.inventory.models import Inventory
+from api.sales.crud import create_sale
+from api.sales.models import Sale
+from api.sales.schemas import SaleCreate
+from db.session import SessionLocal
+
+# Number of threads competing for the last units of an item
+SELLERS = 12
+
+# Sales per thread and the lowest sales per second accepted from concurrent sellers of one item
+THROUGHPUT_SALES = 40
+MIN_SALES_PER_SECOND = 50
+
+
+# Function to sell one unit of an item from its own session
+def sell(inventory_id, barrier, accepted, rejected):
+    db = SessionLocal()
+    try:
+        barrier.wait()
+        create_sale(db, SaleCreate(inventory_id=inventory_id, quantity_sold=1))
+        accepted.append(inventory_id)
+    except HTTPException:
+        rejected.append(inventory_id)
+    finally:
+        db.close()
+
+
+# Function to sell one unit of an item per sale, several times from its own session
+def sell_repeatedly(inventory_id, count, barrier, accepted):
+    db = SessionLocal()
+    try:
+        barrier.wait()
+        for _ in range(count):
+            create_sale(db, SaleCreate(inventory_id=inventory_id, quantity_sold=1))
+            accepted.append(inventory_id)
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("shard_count", [0, 4])
+def test_concurrent_sales_never_oversell(create_product, db, shard_count):
+    stock = 5
+    inventory_id = create_product(quantity=stock, shard_count=shard_count)
+
+    barrier = threading.Barrier(SELLERS)
+    accepted, rejected = [], []
+    threads = [
+        threading.Thread(target=sell, args=(inventory_id, barrier, accepted, rejected))
+        for _ in range(SELLERS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    quantity = get_inventory_quantity(db.get(Inventory, inventory_id))
+    sold = db.query(Sale).filter(Sale.inventory_id == inventory_id).count()
+    assert quantity >= 0
+    assert len(accepted) + len(rejected) == SELLERS
+    assert len(accepted) == sold == stock - quantity
+    assert quantity == 0
+
+
+@pytest.mark.parametrize("shard_count", [0, 4])
+def test_concurrent_sales_throughput(create_product, db, shard_count):
+    sellers = 4
+    stock = sellers * THROUGHPUT_SALES
+    inventory_id = create_product(quantity=stock, shard_count=shard_count)
+
+    barrier = threading.Barrier(sellers + 1)
+    accepted = []
+    threads = [
+        threading.Thread(target=sell_repeatedly, args=(inventory_id, THROUGHPUT_SALES, barrier, accepted))
+        for _ in range(sellers)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    assert len(accepted) == stock
+    assert get_inventory_quantity(db.get(Inventory, inventory_id)) == 0
+    assert stock / elapsed >= MIN_SALES_PER_SECOND, f"{stock / elapsed:.0f} sales/s"
@@ -0,0 +1,24 @@
+import json
+from datetime import datetime
+from api.sales.crud import export_sales
+from api.sales.models import Sale
+from utils.enums import Category, ExportFormat
+
+
+def test_export_pages_through_every_sale_once(create_product, db):
+    inventory_id = create_product(quantity=10)
+    # Sales sharing a timestamp are ordered by ID across page boundaries
+    sale_date = datetime(2030, 1, 2, 3, 4, 5)
+    db.add_all(
+        Sale(inventory_id=inventory_id, quantity_sold=1, unit_price=10.0, category=Category.LAPTOPS,
+             sale_date=sale_date)
+        for _ in range(7)
+    )
+    db.commit()
+
+    chunks = list(export_sales(db, ExportFormat.NDJSON, start_date=sale_date.date(), batch_size=3))
+    ids = [json.loads(line)["id"] for chunk in chunks for line in chunk.splitlines()]
+
+    assert len(chunks) == 3
+    assert len(ids) == 7
+    assert ids == sorted(set(ids))